@@ -124,6 +124,11 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
 STATIC_URL = 'static/'
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    'voter_analytics.finders.PlotlyJSFinder',
+]
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -145,3 +150,7 @@ STORAGES = {
 }
 LOGIN_URL = '/rate_my_interviewer/login/'
 
+# 'rollup' answers voter_analytics charts from the VoterRollup table;
+# 'numpy' keeps every voter in memory as NumPy arrays (needs numpy installed).
+VOTER_ANALYTICS_ENGINE = 'rollup'
+
@@ -0,0 +1,9 @@
+# Settings shared by the apps' test suites.
+
+# Uploads go to memory, and static files use the plain storage because
+# the manifest storage needs collectstatic, which tests don't run.
+# Use with @override_settings(STORAGES=TEST_STORAGES).
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.db.models import Q
+
+# Seconds a cached friend set lives. Friend saves and deletes invalidate it
+# right away in a shared cache; with the per-process default cache, other
+# processes catch up within this long.
+FRIENDS_CACHE_TIMEOUT = 300
+
+# Profiles looked up per Friend query on a cache miss.
+LOOKUP_BATCH_SIZE = 500
+
+
+def _key(profile_id):
+    return f'mini_fb:friends:{profile_id}'
+
+
+def friend_id_sets(profile_ids):
+    """
+    {profile id: frozenset of friend profile ids} for each of `profile_ids`,
+    read from the cache in one round trip; the misses are filled from
+    Friend and cached.
+    """
+    profile_ids = list(profile_ids)
+    cached = cache.get_many([_key(pk) for pk in profile_ids])
+    sets = {pk: cached[_key(pk)] for pk in profile_ids if _key(pk) in cached}
+    missing = [pk for pk in profile_ids if pk not in sets]
+    if missing:
+        found = query_friend_ids(missing)
+        cache.set_many({_key(pk): ids for pk, ids in found.items()}, FRIENDS_CACHE_TIMEOUT)
+        sets.update(found)
+    return sets
+
+
+def query_friend_ids(profile_ids):
+    """Like friend_id_sets(), but always read from Friend, for writes that must not act on a stale set."""
+    # Imported here because models imports this module
+    from .models import Friend
+    adjacency = {pk: set() for pk in profile_ids}
+    profile_ids = list(adjacency)
+    for start in range(0, len(profile_ids), LOOKUP_BATCH_SIZE):
+        batch = profile_ids[start:start + LOOKUP_BATCH_SIZE]
+        rows = Friend.objects.filter(Q(profile1__in=batch) | Q(profile2__in=batch)).values_list('profile1', 'profile2')
+        for profile1, profile2 in rows:
+            if profile1 in adjacency:
+                adjacency[profile1].add(profile2)
+            if profile2 in adjacency:
+                adjacency[profile2].add(profile1)
+    return {pk: frozenset(ids) for pk, ids in adjacency.items()}
+
+
+def friend_ids_of(profile_id):
+    """Frozenset of the ids of a profile's friends."""
+    return friend_id_sets([profile_id])[profile_id]
+
+
+def forget_friends(*profile_ids):
+    cache.delete_many([_key(pk) for pk in profile_ids])
@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mini_fb.models import Image
+from mini_fb.thumbnails import build_variants_in_worker
+
+
+class Command(BaseCommand):
+    help = 'Build the resized variants of status images uploaded before thumbnails existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Rebuild the variants of every image, not only those without any.')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'MINI_FB_THUMBNAIL_WORKERS', 2),
+                            help='Threads resizing images.')
+
+    def handle(self, *args, **options):
+        images = Image.objects.all() if options['rebuild'] else Image.objects.filter(variants={})
+        pks = list(images.order_by('pk').values_list('pk', flat=True))
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            for done, built in enumerate(pool.map(build_variants_in_worker, pks), 1):
+                failed += not built
+                if done % 100 == 0:
+                    self.stdout.write(f'{done}/{len(pks)} images')
+        if failed:
+            self.stdout.write(self.style.WARNING(f'Built {len(pks) - failed} images; {failed} could not be read.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Built {len(pks)} images.'))
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:34
+
+from django.db import migrations, models
+
+
+def canonicalize_friends(apps, schema_editor):
+    # Store each friendship as (lower pk, higher pk), keeping the oldest row
+    # of any duplicated pair and dropping self-friendships
+    Friend = apps.get_model('mini_fb', 'Friend')
+    seen = set()
+    duplicates = []
+    swapped = []
+    for friend in Friend.objects.order_by('id').iterator():
+        pair = tuple(sorted((friend.profile1_id, friend.profile2_id)))
+        if pair[0] == pair[1] or pair in seen:
+            duplicates.append(friend.pk)
+            continue
+        seen.add(pair)
+        if pair[0] != friend.profile1_id:
+            friend.profile1_id, friend.profile2_id = pair
+            swapped.append(friend)
+    for start in range(0, len(duplicates), 500):
+        Friend.objects.filter(pk__in=duplicates[start:start + 500]).delete()
+    Friend.objects.bulk_update(swapped, ['profile1', 'profile2'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0006_profile_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(canonicalize_friends, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='friend',
+            constraint=models.UniqueConstraint(fields=('profile1', 'profile2'), name='friend_unique_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='friend',
+            constraint=models.CheckConstraint(condition=models.Q(('profile1__lt', models.F('profile2'))), name='friend_ordered_pair'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_timelines(apps, schema_editor):
+    # Every status goes into its author's timeline and each friend's
+    Friend = apps.get_model('mini_fb', 'Friend')
+    StatusMessage = apps.get_model('mini_fb', 'StatusMessage')
+    TimelineEntry = apps.get_model('mini_fb', 'TimelineEntry')
+    friends = {}
+    for profile1, profile2 in Friend.objects.values_list('profile1', 'profile2').iterator():
+        friends.setdefault(profile1, []).append(profile2)
+        friends.setdefault(profile2, []).append(profile1)
+    batch = []
+    for pk, author, timestamp in StatusMessage.objects.values_list('pk', 'profile', 'timestamp').iterator():
+        for owner in [author, *friends.get(author, [])]:
+            batch.append(TimelineEntry(owner_id=owner, status_message_id=pk, timestamp=timestamp))
+        if len(batch) >= 1000:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0007_friend_canonical_pair'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='mini_fb.profile')),
+                ('status_message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='mini_fb.statusmessage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', '-timestamp', '-status_message'], name='timeline_feed_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'status_message'), name='timeline_unique_entry')],
+            },
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
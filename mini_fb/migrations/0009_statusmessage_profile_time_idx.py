@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='statusmessage',
+            index=models.Index(fields=['profile', '-timestamp', '-id'], name='status_profile_time_idx'),
+        ),
+    ]
@@ -1,7 +1,19 @@
-from django.db import models
+import heapq
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import cached_property
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import User ## NEW
+from .graph import forget_friends, friend_id_sets, friend_ids_of
+from .thumbnails import schedule_variants
+from .timeline import backfill_friendship, drop_friendship, fan_out_status
+
+# Friend suggestions shown per page.
+RECOMMENDATIONS_PER_PAGE = 10
 
 class Profile(models.Model):
     first_name = models.CharField(max_length=50)
@@ -12,46 +24,78 @@ class Profile(models.Model):
     def __str__(self):
         return f'{self.first_name} {self.last_name}'
     def get_status_messages(self):
-        return self.statusmessage_set.all().order_by('-timestamp')
+        return self.statusmessage_set.all().prefetch_related('images').order_by('-timestamp', '-pk')
     def get_absolute_url(self):
         return reverse('show_profile', kwargs={'pk': self.pk})
+    @cached_property
+    def friends(self):
+        # One query by id from the cached friend set; cached on the instance,
+        # so a page asks for the friend list once however often it is used
+        return list(Profile.objects.filter(pk__in=friend_ids_of(self.pk)).order_by('pk'))
     def get_friends(self):
-        friends1 = Friend.objects.filter(profile1=self)
-        friends2 = Friend.objects.filter(profile2=self)
-        friends = []
-        for friend in friends1:
-            friends.append(friend.profile2)
-        for friend in friends2:
-            friends.append(friend.profile1)
-        return friends 
+        return self.friends
     def add_friend(self, other):
         if self != other and not self.is_friends_with(other):
-            Friend.objects.create(profile1=self, profile2=other)
+            Friend.objects.get_or_create(**Friend.pair(self, other))
+            # Drop the cached friend lists; saving the Friend clears the
+            # cached friend sets
+            self.__dict__.pop('friends', None)
+            other.__dict__.pop('friends', None)
     def is_friends_with(self, other):
-        return Friend.objects.filter(profile1=self, profile2=other).exists() or Friend.objects.filter(profile1=other, profile2=self).exists()
-    def Recommend_friends(self):
-        AlreadyFriends = self.get_friends()
-        AllProfiles = Profile.objects.all()
-        Recommend = []
-        for profile in AllProfiles:
-            if profile not in AlreadyFriends and profile != self:
-                Recommend.append(profile)
-        return Recommend
+        return other.pk in friend_ids_of(self.pk)
+    def Recommend_friends(self, limit=RECOMMENDATIONS_PER_PAGE, offset=0):
+        # Friends of friends ranked by mutual friends, then same city first.
+        # Mutual counts come from the cached friend sets of the friends, so
+        # the cost follows the friends' friend counts and not the number of
+        # profiles. Each suggestion gets .mutual_friends set.
+        friend_ids = friend_ids_of(self.pk)
+        excluded = friend_ids | {self.pk}
+        mutual = Counter()
+        for ids in friend_id_sets(friend_ids).values():
+            mutual.update(ids - excluded)
+        if not mutual:
+            # Nobody to rank by mutual friends yet; suggest people in the same city
+            neighbours = Profile.objects.filter(city=self.city).exclude(pk__in=excluded).order_by('pk')
+            # Past the last page, answer before an offset the database can't take
+            if offset and offset >= neighbours.count():
+                suggestions = []
+            else:
+                suggestions = list(neighbours[offset:offset + limit])
+        elif offset >= len(mutual):
+            suggestions = []
+        else:
+            candidates = list(mutual)
+            same_city = set()
+            for start in range(0, len(candidates), 500):
+                same_city.update(Profile.objects.filter(pk__in=candidates[start:start + 500], city=self.city)
+                                 .values_list('pk', flat=True))
+            ranked = heapq.nsmallest(offset + limit, mutual,
+                                     key=lambda pk: (-mutual[pk], pk not in same_city, pk))[offset:]
+            profiles = Profile.objects.in_bulk(ranked)
+            suggestions = [profiles[pk] for pk in ranked]
+        for profile in suggestions:
+            profile.mutual_friends = mutual[profile.pk]
+        return suggestions
     def get_news_feed(self):
-        profile_statuses = StatusMessage.objects.filter(profile=self)
-
-        friends = self.get_friends()
-
-        friends_statuses = StatusMessage.objects.filter(profile__in=friends)
-
-        news_feed = profile_statuses | friends_statuses
-        news_feed = news_feed.order_by('-timestamp')  
+        # Statuses were pushed into this profile's timeline when posted, so
+        # the feed is one range read on the timeline index. Author and
+        # images come with the feed, not one query per status
+        news_feed = (StatusMessage.objects.filter(timeline_entries__owner=self)
+                     .select_related('profile').prefetch_related('images')
+                     .annotate(feed_timestamp=models.F('timeline_entries__timestamp'),
+                               feed_id=models.F('timeline_entries__status_message'))
+                     .order_by('-feed_timestamp', '-feed_id'))
         return news_feed
 class StatusMessage(models.Model):
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
     message = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # A profile's statuses, newest first
+            models.Index(fields=['profile', '-timestamp', '-id'], name='status_profile_time_idx'),
+        ]
 
     def __str__(self):
         return f'{self.profile} : {self.message} - {self.timestamp}'
@@ -62,13 +106,105 @@ class StatusMessage(models.Model):
 class Image(models.Model):
     image = models.ImageField(upload_to='images/')
     status_message = models.ForeignKey(StatusMessage, on_delete=models.CASCADE, related_name='images')
+    # Resized copies built in the background, see thumbnails.generate_variants
+    variants = models.JSONField(default=dict, blank=True)
+
+    def srcset(self, format):
+        return ', '.join(f'{self.image.storage.url(name)} {width}w' for width, name in self.variants.get(format, ()))
+    @property
+    def webp_srcset(self):
+        return self.srcset('webp')
+    @property
+    def jpeg_srcset(self):
+        return self.srcset('jpeg')
+    @property
+    def thumbnail_url(self):
+        # Smallest JPEG for browsers that ignore srcset; the original until it is built
+        jpegs = self.variants.get('jpeg')
+        return self.image.storage.url(jpegs[0][1]) if jpegs else self.image.url
 
 
 class Friend(models.Model):
     profile1 = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='profile1')
     profile2 = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='profile2')
     timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Each friendship is stored once, as (lower pk, higher pk)
+        constraints = [
+            models.UniqueConstraint(fields=['profile1', 'profile2'], name='friend_unique_pair'),
+            models.CheckConstraint(condition=models.Q(profile1__lt=models.F('profile2')), name='friend_ordered_pair'),
+        ]
+
     def __str__(self):
         return f'{self.profile1} & {self.profile2}'
-    
 
+    @staticmethod
+    def pair(profile, other):
+        """Field values for the friendship between two profiles, in canonical order."""
+        if profile.pk > other.pk:
+            profile, other = other, profile
+        return {'profile1': profile, 'profile2': other}
+
+    def clean(self):
+        self._order_pair()
+
+    def save(self, *args, **kwargs):
+        self._order_pair()
+        super().save(*args, **kwargs)
+
+    def _order_pair(self):
+        if self.profile1_id and self.profile2_id and self.profile1_id > self.profile2_id:
+            self.profile1, self.profile2 = self.profile2, self.profile1
+
+
+class TimelineEntry(models.Model):
+    # One status in one profile's news feed, written when the status is
+    # posted or a friendship starts (fan-out on write)
+    owner = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='timeline')
+    status_message = models.ForeignKey(StatusMessage, on_delete=models.CASCADE, related_name='timeline_entries')
+    # Copy of status_message.timestamp, so the feed sorts on the index alone
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'status_message'], name='timeline_unique_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-timestamp', '-status_message'], name='timeline_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.owner} <- {self.status_message}'
+
+
+@receiver(post_save, sender=Friend)
+@receiver(post_delete, sender=Friend)
+def forget_cached_friends(sender, instance, **kwargs):
+    # Now for this process, and again at commit so no reader re-caches the
+    # old friend set in between
+    forget_friends(instance.profile1_id, instance.profile2_id)
+    transaction.on_commit(lambda: forget_friends(instance.profile1_id, instance.profile2_id))
+
+
+@receiver(post_save, sender=Friend)
+def backfill_timelines(sender, instance, created, **kwargs):
+    if created:
+        backfill_friendship(instance.profile1_id, instance.profile2_id)
+
+
+@receiver(post_delete, sender=Friend)
+def prune_timelines(sender, instance, **kwargs):
+    drop_friendship(instance.profile1_id, instance.profile2_id)
+
+
+@receiver(post_save, sender=StatusMessage)
+def fan_out_new_status(sender, instance, created, **kwargs):
+    if created:
+        fan_out_status(instance)
+
+
+@receiver(post_save, sender=Image)
+def build_thumbnails(sender, instance, created, **kwargs):
+    if created and instance.image:
+        schedule_variants(instance.pk)
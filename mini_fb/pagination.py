@@ -0,0 +1,49 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+# Statuses per page of the news feed and of a profile's status list.
+STATUSES_PER_PAGE = 20
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(status):
+    """Opaque URL-safe token for the position just after `status`."""
+    key = f'{status.timestamp.isoformat()}|{status.pk}'
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8').split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(token) from e
+
+
+def status_page(queryset, timestamp_field, id_field, after=None, per_page=STATUSES_PER_PAGE):
+    """
+    One page of statuses, newest first, continuing after the cursor
+    `after`. Returns (statuses, cursor for the next page or None).
+
+    Pages seek on (timestamp, id) instead of using OFFSET, so every page
+    is the same short index range read however far back it is. The
+    redundant `timestamp <= t` bound lets the database start that range at
+    the cursor.
+    """
+    queryset = queryset.order_by(f'-{timestamp_field}', f'-{id_field}')
+    if after:
+        timestamp, pk = decode_cursor(after)
+        queryset = queryset.filter(
+            Q(**{f'{timestamp_field}__lte': timestamp})
+            & (Q(**{f'{timestamp_field}__lt': timestamp}) | Q(**{timestamp_field: timestamp, f'{id_field}__lt': pk}))
+        )
+    statuses = list(queryset[:per_page + 1])
+    if len(statuses) > per_page:
+        statuses = statuses[:per_page]
+        return statuses, encode_cursor(statuses[-1])
+    return statuses, None
@@ -0,0 +1,19 @@
+// "Load more" links: fetch the next page of statuses as JSON and append its
+// rendered items. Without JavaScript the link still opens the next page.
+document.querySelectorAll('.load-more').forEach(function (link) {
+  link.addEventListener('click', function (event) {
+    event.preventDefault();
+    const list = document.getElementById(link.dataset.list);
+    fetch(link.dataset.url + '?after=' + encodeURIComponent(link.dataset.next))
+      .then(function (response) { return response.json(); })
+      .then(function (page) {
+        list.insertAdjacentHTML('beforeend', page.html);
+        if (page.next) {
+          link.dataset.next = page.next;
+          link.href = '?after=' + page.next;
+        } else {
+          link.remove();
+        }
+      });
+  });
+});
@@ -1,3 +1,240 @@
-from django.test import TestCase
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image as PILImage
+
+from cs412.testing import TEST_STORAGES
+
+from .models import RECOMMENDATIONS_PER_PAGE, Friend, Image, Profile, StatusMessage, TimelineEntry
+from .pagination import STATUSES_PER_PAGE
+from .thumbnails import THUMBNAIL_WIDTHS, build_variants
+
+
+def make_profile(name, city='Boston'):
+    user = User.objects.create_user(name)
+    return Profile.objects.create(first_name=name.title(), last_name='X', city=city,
+                                  profile_image_url='https://example.com/p.png', user=user)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class NewsFeedTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.profile = make_profile('alice')
+        self.friend = make_profile('bob', 'Newton')
+        Friend.objects.create(profile1=self.profile, profile2=self.friend)
+        self.client.force_login(self.profile.user)
+
+    def post_statuses(self, count):
+        for i in range(count):
+            status = StatusMessage.objects.create(profile=(self.profile, self.friend)[i % 2], message=f'status {i}')
+            Image.objects.create(status_message=status, image=f'images/{i}.jpg')
+            Image.objects.create(status_message=status, image=f'images/{i}b.jpg')
+
+    def get_feed(self):
+        # Session, user, profile, timeline statuses, images
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('news_feed'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_grow_with_feed(self):
+        self.post_statuses(2)
+        response = self.get_feed()
+        self.assertEqual(len(response.context['news_feed']), 2)
+        self.post_statuses(20)
+        response = self.get_feed()
+        self.assertEqual(len(response.context['news_feed']), STATUSES_PER_PAGE)
+        self.assertContains(response, 'images/0b.jpg')
+        self.assertContains(response, 'Bob X')
+
+    def test_load_more_walks_the_whole_feed(self):
+        self.post_statuses(STATUSES_PER_PAGE * 2 + 5)
+        expected = list(StatusMessage.objects.order_by('-timestamp', '-pk').values_list('pk', flat=True))
+        response = self.client.get(reverse('news_feed'))
+        seen = [status.pk for status in response.context['news_feed']]
+        after = response.context['next_cursor']
+        while after:
+            page = self.client.get(reverse('news_feed_more'), {'after': after}).json()
+            seen += [status['id'] for status in page['statuses']]
+            after = page['next']
+        self.assertEqual(seen, expected)
+
+    def test_profile_statuses_pages(self):
+        self.post_statuses(STATUSES_PER_PAGE * 2 + 2)
+        expected = list(self.friend.get_status_messages().values_list('pk', flat=True))
+        response = self.client.get(reverse('show_profile', kwargs={'pk': self.friend.pk}))
+        seen = [status.pk for status in response.context['statuses']]
+        page = self.client.get(reverse('profile_statuses', kwargs={'pk': self.friend.pk}),
+                               {'after': response.context['next_cursor']}).json()
+        seen += [status['id'] for status in page['statuses']]
+        self.assertIsNone(page['next'])
+        self.assertIn('status-images', page['html'])
+        self.assertEqual(seen, expected)
+
+    def test_bad_cursor_is_not_found(self):
+        response = self.client.get(reverse('news_feed_more'), {'after': 'not a cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ThumbnailTests(TestCase):
+
+    def setUp(self):
+        self.status = StatusMessage.objects.create(profile=make_profile('alice'), message='photos')
+
+    def upload(self, size):
+        buffer = BytesIO()
+        PILImage.new('RGB', size, 'red').save(buffer, 'JPEG')
+        image = Image(status_message=self.status)
+        image.image.save('photo.jpg', ContentFile(buffer.getvalue()), save=False)
+        with self.captureOnCommitCallbacks() as callbacks:
+            image.save()
+        self.assertEqual(len(callbacks), 1)
+        return image
+
+    def test_variants_at_each_width(self):
+        image = self.upload((1000, 500))
+        self.assertTrue(build_variants(image.pk))
+        image.refresh_from_db()
+        self.assertEqual([width for width, _ in image.variants['jpeg']], list(THUMBNAIL_WIDTHS))
+        self.assertTrue(image.image.storage.exists(image.variants['jpeg'][0][1]))
+        self.assertIn(' 300w', image.jpeg_srcset)
+        self.assertEqual(image.thumbnail_url, image.image.storage.url(image.variants['jpeg'][0][1]))
+
+    def test_small_image_is_not_enlarged(self):
+        image = self.upload((100, 40))
+        build_variants(image.pk)
+        image.refresh_from_db()
+        self.assertEqual([width for width, _ in image.variants['jpeg']], [100])
+
+    def test_unreadable_file_keeps_original(self):
+        image = Image(status_message=self.status)
+        image.image.save('broken.jpg', ContentFile(b'not an image'), save=False)
+        image.save()
+        with self.assertLogs('mini_fb.thumbnails', 'ERROR'):
+            self.assertFalse(build_variants(image.pk))
+        image.refresh_from_db()
+        self.assertEqual(image.variants, {})
+        self.assertEqual(image.thumbnail_url, image.image.url)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class FriendSuggestionTests(TestCase):
+
+    def setUp(self):
+        # Friend sets are cached by pk, and pks are reused between tests
+        cache.clear()
+        self.profile = make_profile('alice')
+        self.client.force_login(self.profile.user)
+
+    def get_page(self, page):
+        response = self.client.get(reverse('recommend_friends'), {'page': page})
+        self.assertEqual(response.status_code, 200)
+        return response.context['RecommendFriends']
+
+    def make_graph(self):
+        bob, carol = make_profile('bob', 'Newton'), make_profile('carol', 'Newton')
+        dave, erin = make_profile('dave', 'Newton'), make_profile('erin')
+        frank, gina = make_profile('frank', 'Newton'), make_profile('gina')
+        for profile, other in ((self.profile, bob), (self.profile, carol), (bob, dave), (carol, dave),
+                               (bob, erin), (carol, frank), (bob, gina)):
+            profile.add_friend(other)
+        return dave, erin, frank, gina
+
+    def test_ranked_by_mutual_friends_then_city_then_pk(self):
+        dave, erin, frank, gina = self.make_graph()
+        suggestions = self.profile.Recommend_friends()
+        self.assertEqual(suggestions, [dave, erin, gina, frank])
+        self.assertEqual([profile.mutual_friends for profile in suggestions], [2, 1, 1, 1])
+        self.assertEqual(self.profile.Recommend_friends(limit=2, offset=1), [erin, gina])
+        self.assertEqual(self.profile.Recommend_friends(offset=4), [])
+        self.assertEqual(self.get_page(1), [dave, erin, gina, frank])
+
+    def test_no_friends_suggests_same_city(self):
+        make_profile('outsider', 'Newton')
+        neighbours = [make_profile('bob'), make_profile('carol')]
+        suggestions = self.profile.Recommend_friends()
+        self.assertEqual(suggestions, neighbours)
+        self.assertEqual([profile.mutual_friends for profile in suggestions], [0, 0])
+
+    def test_page_past_the_end_is_empty(self):
+        neighbours = [make_profile(f'user{i}') for i in range(RECOMMENDATIONS_PER_PAGE + 2)]
+        self.assertEqual(len(self.get_page(1)), RECOMMENDATIONS_PER_PAGE)
+        self.assertEqual(len(self.get_page(2)), 2)
+        self.assertEqual(self.get_page(3), [])
+        self.assertEqual(self.get_page('99999999999999999999999'), [])
+        self.profile.add_friend(neighbours[0])
+        self.assertEqual(self.get_page('99999999999999999999999'), [])
+
+
+class FriendTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.alice = make_profile('alice')
+        self.bob = make_profile('bob')
+
+    def test_reversed_pair_is_stored_in_order(self):
+        friend = Friend.objects.create(profile1=self.bob, profile2=self.alice)
+        friend.refresh_from_db()
+        self.assertEqual((friend.profile1, friend.profile2), (self.alice, self.bob))
+        self.assertEqual(Friend.pair(self.bob, self.alice), {'profile1': self.alice, 'profile2': self.bob})
+
+    def test_friendship_changes_are_seen_through_the_cache(self):
+        # Both friend sets are cached empty before the friendship exists
+        self.assertFalse(self.alice.is_friends_with(self.bob))
+        self.assertFalse(self.bob.is_friends_with(self.alice))
+        friend = Friend.objects.create(profile1=self.bob, profile2=self.alice)
+        self.assertTrue(self.alice.is_friends_with(self.bob))
+        self.assertTrue(self.bob.is_friends_with(self.alice))
+        friend.delete()
+        self.assertFalse(self.alice.is_friends_with(self.bob))
+        self.assertFalse(self.bob.is_friends_with(self.alice))
+
+
+class TimelineTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.alice = make_profile('alice')
+        self.bob = make_profile('bob')
+        self.carol = make_profile('carol')
+        self.alice_status = StatusMessage.objects.create(profile=self.alice, message='from alice')
+        self.bob_status = StatusMessage.objects.create(profile=self.bob, message='from bob')
+
+    def timeline(self, profile):
+        return set(TimelineEntry.objects.filter(owner=profile).values_list('status_message', flat=True))
+
+    def test_own_statuses_are_on_own_timeline(self):
+        self.assertEqual(self.timeline(self.alice), {self.alice_status.pk})
+        self.assertEqual(self.timeline(self.bob), {self.bob_status.pk})
+
+    def test_new_friend_backfills_both_timelines(self):
+        self.alice.add_friend(self.bob)
+        self.assertEqual(self.timeline(self.alice), {self.alice_status.pk, self.bob_status.pk})
+        self.assertEqual(self.timeline(self.bob), {self.alice_status.pk, self.bob_status.pk})
+        self.assertEqual(self.timeline(self.carol), set())
+        entry = TimelineEntry.objects.get(owner=self.alice, status_message=self.bob_status)
+        self.assertEqual(entry.timestamp, self.bob_status.timestamp)
+
+    def test_new_status_fans_out_to_friends(self):
+        self.alice.add_friend(self.bob)
+        status = StatusMessage.objects.create(profile=self.bob, message='later')
+        self.assertIn(status.pk, self.timeline(self.alice))
+        self.assertNotIn(status.pk, self.timeline(self.carol))
+
+    def test_deleted_friend_prunes_both_timelines(self):
+        self.alice.add_friend(self.bob)
+        self.alice.add_friend(self.carol)
+        Friend.objects.get(**Friend.pair(self.alice, self.bob)).delete()
+        self.assertEqual(self.timeline(self.alice), {self.alice_status.pk})
+        self.assertEqual(self.timeline(self.bob), {self.bob_status.pk})
+        # Carol is still Alice's friend
+        self.assertEqual(self.timeline(self.carol), {self.alice_status.pk})
+        self.assertEqual(list(self.alice.get_news_feed()), [self.alice_status])
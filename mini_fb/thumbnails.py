@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image as PILImage
+from PIL import ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Widths generated for every status image. Pages show them 100-150px
+# wide, so these cover 1x and 2x screens with room for larger layouts.
+THUMBNAIL_WIDTHS = (150, 300, 600)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+
+def variant_formats():
+    """Formats written for each width, best compression first."""
+    return ('webp', 'jpeg') if features.check('webp') else ('jpeg',)
+
+
+def _encode(picture, format):
+    buffer = BytesIO()
+    if format == 'webp':
+        picture.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        if picture.mode == 'RGBA':
+            background = PILImage.new('RGB', picture.size, 'white')
+            background.paste(picture, mask=picture.getchannel('A'))
+            picture = background
+        picture.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def generate_variants(image):
+    """
+    Write resized WebP and JPEG copies of an Image's file to its storage
+    and return the description stored in Image.variants:
+    {'webp': [[width, name], ...], 'jpeg': [...]}, smallest first. Images
+    narrower than a width get one copy at their own width instead.
+    """
+    field = image.image
+    storage = field.storage
+    stem = os.path.splitext(os.path.basename(field.name))[0]
+    with storage.open(field.name, 'rb') as f:
+        picture = PILImage.open(f)
+        # JPEGs can be decoded straight at a fraction of their size, which
+        # is most of the cost for camera photos
+        picture.draft('RGB', (max(THUMBNAIL_WIDTHS), max(THUMBNAIL_WIDTHS)))
+        picture.load()
+        picture = ImageOps.exif_transpose(picture)
+        if picture.mode not in ('RGB', 'RGBA'):
+            picture = picture.convert('RGBA' if picture.has_transparency_data else 'RGB')
+    original_width, original_height = picture.size
+    widths = sorted({min(width, original_width) for width in THUMBNAIL_WIDTHS})
+    formats = variant_formats()
+    variants = {format: [] for format in formats}
+    for width in widths:
+        height = max(1, round(original_height * width / original_width))
+        resized = picture.resize((width, height), PILImage.Resampling.LANCZOS, reducing_gap=3.0)
+        for format in formats:
+            name = storage.save(f'thumbnails/{stem}-{width}.{"jpg" if format == "jpeg" else format}',
+                                ContentFile(_encode(resized, format)))
+            variants[format].append([width, name])
+    return variants
+
+
+def build_variants(pk):
+    """(Re)build the variants of one Image. Returns False if its file can't be read as an image."""
+    # Imported here because models imports this module
+    from .models import Image
+    image = Image.objects.filter(pk=pk).first()
+    if image is None:
+        return False
+    try:
+        variants = generate_variants(image)
+    except (OSError, PILImage.DecompressionBombError):
+        logger.exception('Could not build thumbnails for image %s', pk)
+        return False
+    delete_variants(image.variants, image.image.storage)
+    Image.objects.filter(pk=pk).update(variants=variants)
+    return True
+
+
+def delete_variants(variants, storage):
+    for format in ('webp', 'jpeg'):
+        for _, name in variants.get(format, ()):
+            storage.delete(name)
+
+
+def build_variants_in_worker(pk):
+    try:
+        return build_variants(pk)
+    finally:
+        # Worker threads get their own connection; don't leave it open
+        connection.close()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_executor():
+    """The process-wide pool that builds thumbnails off the request path."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'MINI_FB_THUMBNAIL_WORKERS', 2),
+                                               thread_name_prefix='thumbnails')
+    return _executor
+
+
+def schedule_variants(pk):
+    """Build an Image's variants in the background once the upload is committed."""
+    transaction.on_commit(lambda: thumbnail_executor().submit(build_variants_in_worker, pk))
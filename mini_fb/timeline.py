@@ -0,0 +1,38 @@
+from .graph import query_friend_ids
+
+# TimelineEntry rows written per bulk_create.
+FAN_OUT_BATCH_SIZE = 1000
+
+
+def _write_entries(entries):
+    # Imported here because models imports this module
+    from .models import TimelineEntry
+    TimelineEntry.objects.bulk_create(entries, batch_size=FAN_OUT_BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out_status(status):
+    """Add a new status to the timelines of its author and the author's friends."""
+    from .models import TimelineEntry
+    owners = {status.profile_id, *query_friend_ids([status.profile_id])[status.profile_id]}
+    _write_entries([
+        TimelineEntry(owner_id=owner, status_message=status, timestamp=status.timestamp)
+        for owner in owners
+    ])
+
+
+def backfill_friendship(profile_id, other_id):
+    """Copy each new friend's existing statuses into the other's timeline."""
+    from .models import StatusMessage, TimelineEntry
+    for owner, author in ((profile_id, other_id), (other_id, profile_id)):
+        statuses = StatusMessage.objects.filter(profile_id=author).values_list('pk', 'timestamp')
+        _write_entries([
+            TimelineEntry(owner_id=owner, status_message_id=pk, timestamp=timestamp)
+            for pk, timestamp in statuses.iterator(chunk_size=FAN_OUT_BATCH_SIZE)
+        ])
+
+
+def drop_friendship(profile_id, other_id):
+    """Take each former friend's statuses out of the other's timeline."""
+    from .models import TimelineEntry
+    for owner, author in ((profile_id, other_id), (other_id, profile_id)):
+        TimelineEntry.objects.filter(owner_id=owner, status_message__profile_id=author).delete()
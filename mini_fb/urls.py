@@ -1,10 +1,11 @@
 from django.urls import path
-from .views import CreateFriendView, CreateProfileView, CreateStatusMessageView, DeleteStatusMessageView, ShowAllProfilesView, ShowFriendSuggestionsView, ShowNewsFeedView, ShowProfilePageView, ShowProfilePageViewNoKey, UpdateProfileView, UpdateStatusMessageView
+from .views import CreateFriendView, CreateProfileView, CreateStatusMessageView, DeleteStatusMessageView, NewsFeedMoreView, ProfileStatusesView, ShowAllProfilesView, ShowFriendSuggestionsView, ShowNewsFeedView, ShowProfilePageView, ShowProfilePageViewNoKey, UpdateProfileView, UpdateStatusMessageView
 from django.contrib.auth import views as auth_views
 
 urlpatterns = [
     path('', ShowAllProfilesView.as_view(), name='show_all_profiles'),
     path('profile/<int:pk>/', ShowProfilePageView.as_view(), name='show_profile'),
+    path('profile/<int:pk>/statuses/', ProfileStatusesView.as_view(), name='profile_statuses'),
     path('create_profile/', CreateProfileView.as_view(), name='create_profile'),
     path('status/create_status/', CreateStatusMessageView.as_view(), name='create_status'),
     path('profile/update/', UpdateProfileView.as_view(), name='update_profile'),
@@ -13,6 +14,7 @@ urlpatterns = [
     path('profile/add_friend/<int:other_pk>', CreateFriendView.as_view(), name='add_friend'),
     path('profile/friend_suggestions/', ShowFriendSuggestionsView.as_view(), name='recommend_friends'),
     path('profile/news_feed/', ShowNewsFeedView.as_view(), name='news_feed'),
+    path('profile/news_feed/more/', NewsFeedMoreView.as_view(), name='news_feed_more'),
     path('login/', auth_views.LoginView.as_view(template_name='mini_fb/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='mini_fb/logged_out.html'), name='logout'),
     path('profile/', ShowProfilePageViewNoKey.as_view(), name='show_profile'),
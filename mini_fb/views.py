@@ -3,21 +3,61 @@ from django.urls import reverse
 from django.views.generic.detail import DetailView
 from django.views import View
 from django.views.generic import UpdateView, UpdateView, DeleteView,CreateView
-from .models import Friend, Profile, StatusMessage, Image
+from .models import RECOMMENDATIONS_PER_PAGE, Friend, Profile, StatusMessage, Image
 from .forms import CreateProfileForm, CreateStatusMessageForm, UpdateProfileForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import redirect
 from django.contrib.auth.forms import UserCreationForm 
 from django.contrib.auth import login
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
+from .pagination import InvalidCursor, status_page
+class StatusPageMixin:
+    # Cursor-paginated statuses: get_statuses() gives the queryset,
+    # status_ordering the (timestamp, id) fields it is sorted on.
+    status_ordering = ('timestamp', 'pk')
+    items_template_name = 'mini_fb/status_items.html'
+    def get_statuses(self):
+        return self.object.get_status_messages()
+    def get_status_page(self):
+        try:
+            return status_page(self.get_statuses(), *self.status_ordering, after=self.request.GET.get('after'))
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['statuses'], context['next_cursor'] = self.get_status_page()
+        return context
+    def render_status_page(self):
+        # The next page as JSON, with its items pre-rendered for "Load more"
+        statuses, next_cursor = self.get_status_page()
+        html = render_to_string(self.items_template_name,
+                                {'statuses': statuses, 'profile': self.object}, request=self.request)
+        return JsonResponse({
+            'statuses': [{
+                'id': status.pk,
+                'profile': status.profile_id,
+                'message': status.message,
+                'timestamp': status.timestamp.isoformat(),
+                'images': [{'url': image.image.url, 'thumbnail': image.thumbnail_url}
+                           for image in status.get_images()],
+            } for status in statuses],
+            'html': html,
+            'next': next_cursor,
+        })
 class ShowAllProfilesView(ListView):
     model = Profile
     template_name = 'mini_fb/show_all_profiles.html'
     context_object_name = 'profiles'
-class ShowProfilePageView(DetailView):
+class ShowProfilePageView(StatusPageMixin, DetailView):
     model = Profile
     template_name = 'mini_fb/show_profile.html'
     context_object_name = 'profile'
-class ShowProfilePageViewNoKey(DetailView):
+class ProfileStatusesView(ShowProfilePageView):
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return self.render_status_page()
+class ShowProfilePageViewNoKey(StatusPageMixin, DetailView):
     model = Profile
     template_name = 'mini_fb/show_profile.html'
     context_object_name = 'profile'
@@ -130,21 +170,35 @@ class ShowFriendSuggestionsView(LoginRequiredMixin,DetailView):
         return profile
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        profile = Profile.objects.get(pk=self.request.user.pk)
-        RecommendFriends = profile.Recommend_friends()
-        context['RecommendFriends'] = RecommendFriends
+        profile = self.object
+        try:
+            page = max(1, int(self.request.GET.get('page', 1)))
+        except ValueError:
+            page = 1
+        # One extra suggestion tells whether there is a next page
+        RecommendFriends = profile.Recommend_friends(limit=RECOMMENDATIONS_PER_PAGE + 1,
+                                                     offset=(page - 1) * RECOMMENDATIONS_PER_PAGE)
+        context['RecommendFriends'] = RecommendFriends[:RECOMMENDATIONS_PER_PAGE]
+        context['page'] = page
+        context['has_next'] = len(RecommendFriends) > RECOMMENDATIONS_PER_PAGE
 
         return context
-class ShowNewsFeedView(LoginRequiredMixin,DetailView):
+class ShowNewsFeedView(LoginRequiredMixin,StatusPageMixin,DetailView):
     model = Profile
     template_name = 'mini_fb/news_feed.html'
     context_object_name = 'profile'
+    status_ordering = ('feed_timestamp', 'feed_id')
+    items_template_name = 'mini_fb/news_feed_items.html'
     def get_object(self):
         profile = Profile.objects.get(user=self.request.user)
         return profile
+    def get_statuses(self):
+        return self.object.get_news_feed()
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        profile = Profile.objects.get(user=self.request.user)
-        news_feed = profile.get_news_feed()
-        context['news_feed'] = news_feed
+        context['news_feed'] = context['statuses']
         return context
+class NewsFeedMoreView(ShowNewsFeedView):
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return self.render_status_page()
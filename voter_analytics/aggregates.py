@@ -0,0 +1,54 @@
+from collections import Counter
+
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractYear
+
+from .models import ELECTION_FIELDS
+
+
+def chart_data(queryset):
+    """
+    Everything the GraphsView charts need, from a single GROUP BY.
+
+    Voters are grouped by (birth year, party) with one conditional COUNT per
+    election, and the groups are then folded into the birth-year histogram,
+    the party breakdown and the election totals. The result has at most
+    years x parties rows, so no Voter objects are ever materialized.
+    """
+    groups = (
+        queryset.order_by()
+        .annotate(year=ExtractYear('date_of_birth'))
+        .values('year', 'party_affiliation')
+        .annotate(
+            count=Count('pk'),
+            **{field: Count('pk', filter=Q(**{field: True})) for field in ELECTION_FIELDS},
+        )
+    )
+    return fold_groups(groups)
+
+
+def fold_groups(groups):
+    """Fold (year, party) groups with per-election counts into chart series."""
+    by_year = Counter()
+    by_party = Counter()
+    by_election = dict.fromkeys(ELECTION_FIELDS, 0)
+    for group in groups:
+        by_year[group['year']] += group['count']
+        by_party[group['party_affiliation']] += group['count']
+        for field in ELECTION_FIELDS:
+            by_election[field] += group[field]
+    years = sorted(by_year)
+    parties = sorted(by_party)
+    return {
+        'years': years,
+        'year_counts': [by_year[year] for year in years],
+        'parties': parties,
+        'party_counts': [by_party[party] for party in parties],
+        'elections': list(by_election),
+        'election_counts': list(by_election.values()),
+    }
+
+
+def participation_breakdown(queryset):
+    """Voter counts per election-participation pattern, as {bitmask: count}, from one GROUP BY."""
+    return dict(queryset.order_by().values_list('participation').annotate(count=Count('pk')))
@@ -0,0 +1,111 @@
+import csv
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import connection
+
+from .ingest import CSV_COLUMNS, DATA_FIELDS, analyze_voters
+from .models import ELECTION_BITS, ELECTION_FIELDS, Voter
+from .search import rebuild_search_index
+
+# Rough party mix of the Newton voter file.
+PARTY_WEIGHTS = {'U ': 55, 'D ': 32, 'R ': 9, 'J ': 2, 'L ': 1, 'G ': 1}
+
+
+@contextmanager
+def scratch_database():
+    """Run the body against a freshly migrated throwaway copy of the default database."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def synthetic_voters(count, seed=0):
+    """Yield `count` plausible voter rows as dicts of column values."""
+    rng = random.Random(seed)
+    parties = list(PARTY_WEIGHTS)
+    weights = list(PARTY_WEIGHTS.values())
+    epoch = date(1920, 1, 1)
+    for i in range(count):
+        votes = [rng.random() < 0.55 for _ in ELECTION_FIELDS]
+        row = {
+            'last_name': f'LAST{rng.randrange(5000)}',
+            'first_name': f'FIRST{rng.randrange(800)}',
+            'date_of_birth': (epoch + timedelta(days=rng.randrange(31000))).isoformat(),
+            'date_of_registration': (epoch + timedelta(days=rng.randrange(38000, 38000 + 12000))).isoformat(),
+            'party_affiliation': rng.choices(parties, weights)[0],
+            'precinct_number': f'{rng.randrange(1, 9)}{rng.choice("AB")}',
+            'street_number': str(rng.randrange(1, 400)),
+            'street_name': f'STREET {rng.randrange(600)}',
+            'apartment_number': None,
+            'zip_code': rng.choice(['02458', '02459', '02460', '02461', '02462', '02464', '02465', '02466', '02467', '02468']),
+            'voter_score': sum(votes),
+            'participation': sum(bit for bit, voted in zip(ELECTION_BITS.values(), votes) if voted),
+            'natural_key': f'{i:032x}',
+            'row_hash': f'{i:032x}',
+        }
+        row.update(zip(ELECTION_FIELDS, votes))
+        yield row
+
+
+def write_voter_csv(path, count, seed=0):
+    """Write `count` synthetic voters to `path` in the layout of the voter file."""
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['Voter ID Number', *(CSV_COLUMNS[field] for field in DATA_FIELDS)])
+        for i, row in enumerate(synthetic_voters(count, seed)):
+            writer.writerow([
+                f'ID{i}',
+                *('TRUE' if value is True else 'FALSE' if value is False else value
+                  for value in (row[field] for field in DATA_FIELDS)),
+            ])
+
+
+def populate_voters(count, seed=0, batch_size=10000):
+    """Insert synthetic voters with raw executemany, bypassing model instances."""
+    columns = None
+    batch = []
+    with connection.cursor() as cursor:
+        for row in synthetic_voters(count, seed):
+            if columns is None:
+                columns = list(row)
+                sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+                    connection.ops.quote_name(Voter._meta.db_table),
+                    ', '.join(connection.ops.quote_name(Voter._meta.get_field(c).column) for c in columns),
+                    ', '.join(['%s'] * len(columns)),
+                )
+            batch.append([row[c] for c in columns])
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+    # Leave the search index and planner statistics as a real import would
+    rebuild_search_index()
+    analyze_voters()
+
+
+def time_calls(func, repeat):
+    """Call `func` `repeat` times and return (p50, p95) latency in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 50), percentile(samples, 95)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def query_plan(queryset):
+    """The database's plan for a queryset, one step per line."""
+    return '\n'.join(f'    {line}' for line in queryset.explain().splitlines())
@@ -0,0 +1,114 @@
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import ELECTION_BITS, ELECTION_FIELDS, DataVersion, Voter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def columnar_engine_enabled():
+    """True when settings.VOTER_ANALYTICS_ENGINE asks for the in-memory NumPy engine."""
+    return getattr(settings, 'VOTER_ANALYTICS_ENGINE', 'rollup') == 'numpy'
+
+
+class ColumnarVoters:
+    """
+    Every voter held in memory as NumPy column arrays.
+
+    Party and precinct are stored as category codes into sorted label
+    arrays, birth year as int16, score as int8 and participation as a uint8
+    bitmask, about 6 bytes per voter. Filters become vectorized boolean masks
+    and the chart series come from np.bincount, so a query never touches the
+    database.
+    """
+
+    def __init__(self, version, chunk_size=20000):
+        if np is None:
+            raise ImproperlyConfigured('The numpy voter analytics engine requires numpy to be installed.')
+        self.version = version
+        parties, precincts, years, scores, participation = [], [], [], [], []
+        rows = Voter.objects.values_list(
+            'party_affiliation', 'precinct_number', 'date_of_birth', 'voter_score', 'participation',
+        ).iterator(chunk_size=chunk_size)
+        for party, precinct, date_of_birth, score, mask in rows:
+            parties.append(party)
+            precincts.append(precinct)
+            years.append(date_of_birth.year)
+            scores.append(score)
+            participation.append(mask)
+        self.parties, self.party_codes = np.unique(np.array(parties, dtype=object), return_inverse=True)
+        self.precincts, self.precinct_codes = np.unique(np.array(precincts, dtype=object), return_inverse=True)
+        self.birth_years = np.array(years, dtype=np.int16)
+        self.voter_scores = np.array(scores, dtype=np.int8)
+        self.participation = np.array(participation, dtype=np.uint8)
+        self.party_codes = self.party_codes.astype(np.int32)
+        self.precinct_codes = self.precinct_codes.astype(np.int32)
+
+    def __len__(self):
+        return len(self.birth_years)
+
+    def mask(self, voter_filter):
+        """Boolean array selecting the voters that pass a VoterFilter."""
+        selected = np.ones(len(self), dtype=bool)
+        if voter_filter.party_affiliation:
+            code = np.searchsorted(self.parties, voter_filter.party_affiliation)
+            if code >= len(self.parties) or self.parties[code] != voter_filter.party_affiliation:
+                return np.zeros(len(self), dtype=bool)
+            selected &= self.party_codes == code
+        if voter_filter.min_year is not None:
+            selected &= self.birth_years >= voter_filter.min_year
+        if voter_filter.max_year is not None:
+            selected &= self.birth_years <= voter_filter.max_year
+        if voter_filter.voter_score is not None:
+            selected &= self.voter_scores == voter_filter.voter_score
+        if voter_filter.elections:
+            required = np.uint8(voter_filter.participation)
+            if voter_filter.election_match == 'any':
+                selected &= (self.participation & required) != 0
+            else:
+                selected &= (self.participation & required) == required
+        return selected
+
+    def chart_data(self, voter_filter):
+        """Same result as aggregates.chart_data() for the filtered voters."""
+        selected = self.mask(voter_filter)
+        years = self.birth_years[selected].astype(np.int64)
+        data = {'years': [], 'year_counts': [], 'parties': [], 'party_counts': []}
+        if len(years):
+            first_year = int(years.min())
+            year_counts = np.bincount(years - first_year)
+            for offset in np.flatnonzero(year_counts):
+                data['years'].append(first_year + int(offset))
+                data['year_counts'].append(int(year_counts[offset]))
+        party_counts = np.bincount(self.party_codes[selected], minlength=len(self.parties))
+        for code in np.flatnonzero(party_counts):
+            data['parties'].append(str(self.parties[code]))
+            data['party_counts'].append(int(party_counts[code]))
+        participation = self.participation[selected]
+        data['elections'] = list(ELECTION_FIELDS)
+        data['election_counts'] = [
+            int(np.count_nonzero(participation & np.uint8(ELECTION_BITS[field]))) for field in ELECTION_FIELDS
+        ]
+        return data
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def columnar_voters():
+    """The process-wide ColumnarVoters, reloaded whenever the DataVersion changes."""
+    global _engine
+    version = DataVersion.current()
+    engine = _engine
+    if engine is None or engine.version != version:
+        with _engine_lock:
+            if _engine is None or _engine.version != version:
+                _engine = ColumnarVoters(version)
+            engine = _engine
+    return engine
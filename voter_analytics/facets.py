@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.db.models.functions import ExtractYear
+
+from .models import ELECTION_FIELDS, DataVersion, Voter
+
+# Seconds the cached facets live; entries for replaced data versions are
+# unreachable and should not be kept forever.
+FACETS_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def voter_facets():
+    """
+    Options for the filter dropdowns, cached until the next import.
+
+    The cache key includes the current DataVersion, so an import that changes
+    Voter makes the old entry unreachable and the next request recomputes it.
+    """
+    key = f'voter_analytics:facets:{DataVersion.current()}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets()
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def compute_facets():
+    """Distinct parties, birth years and scores, each as one SELECT DISTINCT."""
+    return {
+        'party_affiliations': list(
+            Voter.objects.order_by('party_affiliation').values_list('party_affiliation', flat=True).distinct()
+        ),
+        'years': list(
+            Voter.objects.annotate(year=ExtractYear('date_of_birth')).order_by('year').values_list('year', flat=True).distinct()
+        ),
+        'voter_scores': list(
+            Voter.objects.order_by('voter_score').values_list('voter_score', flat=True).distinct()
+        ),
+        'elections': ELECTION_FIELDS,
+    }
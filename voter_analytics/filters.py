@@ -0,0 +1,101 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import date
+
+from django.db.models import Q
+
+from .models import ELECTION_BITS, ELECTION_FIELDS, masks_with_all, masks_with_any
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _year_or_none(value):
+    year = _int_or_none(value)
+    return year if year is not None and date.min.year <= year <= date.max.year else None
+
+
+@dataclass(frozen=True)
+class VoterFilter:
+    """
+    The voter filter GET parameters, parsed once into a canonical spec.
+
+    Values that do not parse and unknown election names are dropped, and
+    elections are de-duplicated and kept in chronological order, so every
+    query string meaning the same thing gives an equal (and equally hashed)
+    VoterFilter. Every voter_analytics view and cache builds its query or
+    key from here.
+    """
+
+    party_affiliation: str = ''
+    min_year: int = None
+    max_year: int = None
+    voter_score: int = None
+    elections: tuple = ()
+    # 'all': voted in every selected election, 'any': in at least one
+    election_match: str = 'all'
+
+    @classmethod
+    def from_params(cls, params):
+        requested = set(params.getlist('elections'))
+        return cls(
+            party_affiliation=params.get('party_affiliation', ''),
+            min_year=_year_or_none(params.get('min_dob')),
+            max_year=_year_or_none(params.get('max_dob')),
+            voter_score=_int_or_none(params.get('voter_score')),
+            elections=tuple(field for field in ELECTION_FIELDS if field in requested),
+            election_match='any' if params.get('election_match') == 'any' else 'all',
+        )
+
+    @property
+    def participation(self):
+        """Bitmask of the selected elections."""
+        return sum(ELECTION_BITS[field] for field in self.elections)
+
+    def participation_masks(self):
+        """
+        Every participation value that passes the election filter. With five
+        elections there are at most 32, and `participation IN (...)` is one
+        indexed predicate whatever the number of elections selected.
+        """
+        if self.election_match == 'any':
+            return masks_with_any(self.participation)
+        return masks_with_all(self.participation)
+
+    def q(self):
+        """The whole filter as one Q over Voter."""
+        conditions = {}
+        if self.elections:
+            conditions['participation__in'] = self.participation_masks()
+        if self.party_affiliation:
+            conditions['party_affiliation'] = self.party_affiliation
+        if self.min_year is not None:
+            conditions['date_of_birth__gte'] = date(self.min_year, 1, 1)
+        if self.max_year is not None:
+            conditions['date_of_birth__lte'] = date(self.max_year, 12, 31)
+        if self.voter_score is not None:
+            conditions['voter_score'] = self.voter_score
+        return Q(**conditions)
+
+    def rollup_q(self):
+        """The same filter as one Q over VoterRollup."""
+        conditions = {}
+        if self.party_affiliation:
+            conditions['party_affiliation'] = self.party_affiliation
+        if self.min_year is not None:
+            conditions['birth_year__gte'] = self.min_year
+        if self.max_year is not None:
+            conditions['birth_year__lte'] = self.max_year
+        if self.voter_score is not None:
+            conditions['voter_score'] = self.voter_score
+        if self.elections:
+            conditions['participation__in'] = self.participation_masks()
+        return Q(**conditions)
+
+    @property
+    def cache_key(self):
+        return hashlib.sha1(repr(self).encode('utf-8')).hexdigest()
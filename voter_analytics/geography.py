@@ -0,0 +1,83 @@
+import re
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import ELECTION_BITS, ELECTION_FIELDS, DataVersion, Voter, masks_with_all
+
+# Geographic groupings offered by the dashboard, and the Voter field behind each.
+AREA_FIELDS = {'precinct': 'precinct_number', 'zip': 'zip_code'}
+
+# Seconds a cached report lives. A new DataVersion already makes old
+# reports unreachable; the timeout lets the cache drop them too.
+REPORT_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _natural_key(value):
+    # Sort precinct '2A' before '10A'
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', value or '')]
+
+
+def area_report(area, voter_filter):
+    """
+    Turnout, party mix and score distribution per precinct or zip code,
+    cached per data version and filter.
+    """
+    key = f'voter_analytics:geography:{DataVersion.current()}:{area}:{voter_filter.cache_key}'
+    report = cache.get(key)
+    if report is None:
+        report = compute_area_report(area, voter_filter)
+        cache.set(key, report, REPORT_CACHE_TIMEOUT)
+    return report
+
+
+def compute_area_report(area, voter_filter):
+    """
+    Build the report from a single GROUP BY over (area, party, score) with
+    a conditional count per election, folded per area in Python.
+    """
+    field = AREA_FIELDS[area]
+    groups = (
+        Voter.objects.filter(voter_filter.q()).order_by()
+        .values(field, 'party_affiliation', 'voter_score')
+        .annotate(
+            count=Count('pk'),
+            **{
+                election: Count('pk', filter=Q(participation__in=masks_with_all(bit)))
+                for election, bit in ELECTION_BITS.items()
+            },
+        )
+    )
+    areas = {}
+    parties = set()
+    scores = set()
+    for group in groups:
+        name = group[field]
+        totals = areas.setdefault(name, {'voters': 0, 'elections': dict.fromkeys(ELECTION_FIELDS, 0), 'parties': {}, 'scores': {}})
+        totals['voters'] += group['count']
+        for election in ELECTION_FIELDS:
+            totals['elections'][election] += group[election]
+        party, score = group['party_affiliation'], group['voter_score']
+        totals['parties'][party] = totals['parties'].get(party, 0) + group['count']
+        totals['scores'][score] = totals['scores'].get(score, 0) + group['count']
+        parties.add(party)
+        scores.add(score)
+    parties = sorted(parties)
+    scores = sorted(scores)
+    rows = []
+    for name in sorted(areas, key=_natural_key):
+        totals = areas[name]
+        rows.append({
+            'name': name,
+            'voters': totals['voters'],
+            'turnout': [round(totals['elections'][election] / totals['voters'], 4) for election in ELECTION_FIELDS],
+            'party_counts': [totals['parties'].get(party, 0) for party in parties],
+            'score_counts': [totals['scores'].get(score, 0) for score in scores],
+        })
+    return {
+        'area': area,
+        'elections': ELECTION_FIELDS,
+        'parties': parties,
+        'scores': scores,
+        'rows': rows,
+    }
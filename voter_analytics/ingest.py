@@ -0,0 +1,462 @@
+import csv
+import hashlib
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import date
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from sys import intern
+
+import django
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ELECTION_BITS, ELECTION_FIELDS, DataVersion, Voter
+from .rollup import rebuild_rollup
+from .search import rebuild_search_index
+
+# Rows parsed and written per bulk_create call.
+DEFAULT_BATCH_SIZE = 2000
+
+# Fields that identify a voter across voter files.
+NATURAL_KEY_FIELDS = [
+    'last_name', 'first_name', 'date_of_birth',
+    'street_number', 'street_name', 'apartment_number', 'zip_code',
+]
+
+# Fields copied from the CSV; a change to any of them changes row_hash.
+DATA_FIELDS = [
+    'last_name', 'first_name', 'date_of_birth', 'date_of_registration',
+    'party_affiliation', 'precinct_number',
+    'street_number', 'street_name', 'apartment_number', 'zip_code',
+    *ELECTION_FIELDS, 'voter_score',
+]
+
+# Voter file column behind each of DATA_FIELDS.
+CSV_COLUMNS = {
+    'last_name': 'Last Name',
+    'first_name': 'First Name',
+    'date_of_birth': 'Date of Birth',
+    'date_of_registration': 'Date of Registration',
+    'party_affiliation': 'Party Affiliation',
+    'precinct_number': 'Precinct Number',
+    'street_number': 'Residential Address - Street Number',
+    'street_name': 'Residential Address - Street Name',
+    'apartment_number': 'Residential Address - Apartment Number',
+    'zip_code': 'Residential Address - Zip Code',
+    **{field: field for field in ELECTION_FIELDS},
+    'voter_score': 'voter_score',
+}
+
+_NATURAL_KEY_POSITIONS = [DATA_FIELDS.index(field) for field in NATURAL_KEY_FIELDS]
+
+# Field order of the value tuples the decoder produces.
+PARSED_FIELDS = [*DATA_FIELDS, 'participation', 'natural_key', 'row_hash']
+_NATURAL_KEY = PARSED_FIELDS.index('natural_key')
+_ROW_HASH = PARSED_FIELDS.index('row_hash')
+
+# Bytes of CSV decoded (and, with a checkpoint, committed) at a time,
+# about 35,000 voters.
+CHUNK_BYTES = 4 * 1024 * 1024
+
+
+class RowError(ValueError):
+    """A CSV row that could not be turned into a Voter."""
+
+    def __init__(self, line_number, message):
+        super().__init__(f'line {line_number}: {message}')
+        self.line_number = line_number
+        self.message = message
+
+
+class IngestStats:
+    """Counters for one ingest run, reported as a diff summary and rows/sec."""
+
+    def __init__(self):
+        self.rows = 0
+        self.skipped = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.duplicates = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def seconds(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def record_error(self, error):
+        self.skipped += 1
+        if len(self.errors) < 20:
+            self.errors.append(str(error))
+
+    @property
+    def changed(self):
+        return self.inserted + self.updated + self.deleted
+
+    def __str__(self):
+        return (f'{self.rows} rows read: {self.inserted} inserted, {self.updated} updated, '
+                f'{self.unchanged} unchanged, {self.deleted} deleted, '
+                f'{self.duplicates} duplicate keys, {self.skipped} skipped '
+                f'in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/sec)')
+
+
+def _digest(values):
+    text = '\x1f'.join('' if value is None else str(value) for value in values)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def natural_key_for(voter):
+    """Stable identity of a voter: normalized name, date of birth and address."""
+    return _digest(str(getattr(voter, field) or '').strip().upper() for field in NATURAL_KEY_FIELDS)
+
+
+def row_hash_for(voter):
+    """Hash of every imported field, used to detect changed rows."""
+    return _digest(getattr(voter, field) for field in DATA_FIELDS)
+
+
+@lru_cache(maxsize=65536)
+def parse_date(text):
+    """A YYYY-MM-DD date. Birth and registration dates repeat heavily across voters, so results are memoized."""
+    if len(text) != 10:
+        raise ValueError(f'invalid date {text!r}')
+    return date.fromisoformat(text)
+
+
+class RowDecoder:
+    """
+    Decodes voter CSV records (lists from csv.reader) into PARSED_FIELDS
+    tuples, fingerprint included.
+
+    Column positions are resolved once from the header instead of building
+    a dict per row, dates go through the memoized parse_date(), and the
+    low-cardinality strings are interned so every voter in a precinct
+    shares one party, precinct, street and zip string.
+    """
+
+    def __init__(self, header):
+        positions = {name.strip(): index for index, name in enumerate(header)}
+        missing = [column for field, column in CSV_COLUMNS.items()
+                   if column not in positions and field != 'apartment_number']
+        if missing:
+            raise RowError(1, f'missing column {missing[0]!r}')
+        # The apartment column is optional; without it every row gets an
+        # empty trailing field to read it from
+        self.pad = CSV_COLUMNS['apartment_number'] not in positions
+        indexes = [positions.get(CSV_COLUMNS[field], len(header)) for field in DATA_FIELDS]
+        self.width = max(indexes) + 1 - self.pad
+        self.columns = itemgetter(*indexes)
+
+    def decode(self, line_number, record):
+        """One CSV record as a PARSED_FIELDS tuple, raising RowError if it is invalid."""
+        if len(record) < self.width:
+            raise RowError(line_number, f'expected {self.width} columns, got {len(record)}')
+        if self.pad:
+            record = [*record, '']
+        (last_name, first_name, date_of_birth, date_of_registration, party_affiliation, precinct_number,
+         street_number, street_name, apartment_number, zip_code, *votes, voter_score) = self.columns(record)
+        try:
+            votes = [vote == 'TRUE' or vote.strip() == 'TRUE' for vote in votes]
+            values = [
+                last_name,
+                first_name,
+                parse_date(date_of_birth),
+                parse_date(date_of_registration),
+                intern(party_affiliation),
+                intern(precinct_number),
+                street_number,
+                intern(street_name),
+                apartment_number.strip() or None,
+                intern(zip_code),
+                *votes,
+                int(voter_score),
+            ]
+        except ValueError as e:
+            raise RowError(line_number, str(e)) from e
+        participation = sum(bit for bit, voted in zip(ELECTION_BITS.values(), votes) if voted)
+        natural_key = _digest(str(values[i] or '').strip().upper() for i in _NATURAL_KEY_POSITIONS)
+        return (*values, participation, natural_key, _digest(values))
+
+
+def chunked(iterable, size):
+    """Split an iterable into lists of at most `size` items without reading ahead."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def file_hash(csv_file_path):
+    """Content hash identifying a voter file across import runs."""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(csv_file_path, 'rb') as csvfile:
+        while block := csvfile.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_header(csv_file_path):
+    with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
+        return next(csv.reader(csvfile), [])
+
+
+def data_offset(csv_file_path):
+    """Byte offset of the first row after the header."""
+    with open(csv_file_path, 'rb') as csvfile:
+        csvfile.readline()
+        return csvfile.tell()
+
+
+def byte_ranges(csv_file_path, chunk_bytes=None, start=None, stop=None):
+    """
+    Split the file from `start` (the first row by default) to `stop` into
+    (start, end) byte ranges of about `chunk_bytes` (CHUNK_BYTES by
+    default), each ending just after a line break. Assumes no quoted field
+    contains a newline, which holds for the voter file.
+    """
+    chunk_bytes = chunk_bytes or CHUNK_BYTES
+    with open(csv_file_path, 'rb') as csvfile:
+        csvfile.readline()
+        if start is None:
+            start = csvfile.tell()
+        size = os.fstat(csvfile.fileno()).st_size
+        stop = size if stop is None else min(stop, size)
+        while start < stop:
+            if start + chunk_bytes >= stop:
+                end = stop
+            else:
+                csvfile.seek(start + chunk_bytes)
+                csvfile.readline()
+                end = min(csvfile.tell(), stop)
+            yield start, end
+            start = end
+
+
+def parse_byte_range(csv_file_path, start, end, header):
+    """
+    Parse worker: decode one byte range of the CSV into PARSED_FIELDS
+    tuples. Returns (lines read, values, [(line, message), ...] for invalid
+    rows), with line numbers relative to the start of the range.
+    """
+    with open(csv_file_path, 'rb') as csvfile:
+        csvfile.seek(start)
+        text = csvfile.read(end - start).decode('utf-8')
+    decoder = RowDecoder(header)
+    reader = csv.reader(io.StringIO(text, newline=''))
+    values = []
+    errors = []
+    for record in reader:
+        if not record:
+            continue
+        try:
+            values.append(decoder.decode(reader.line_num, record))
+        except RowError as e:
+            errors.append((e.line_number, e.message))
+    return reader.line_num, values, errors
+
+
+def parsed_ranges(csv_file_path, workers=1, start=None, stop=None):
+    """
+    Yield (end offset, lines read, values, errors) for each byte range of
+    the file in order; see parse_byte_range().
+
+    With more than one worker the ranges are parsed by a process pool, and
+    results are still yielded in file order to the single writer in this
+    process.
+    """
+    header = read_header(csv_file_path)
+    # Fail on a bad header here rather than once per range
+    RowDecoder(header)
+    ranges = byte_ranges(csv_file_path, start=start, stop=stop)
+    if workers <= 1:
+        for range_start, range_end in ranges:
+            yield (range_end, *parse_byte_range(csv_file_path, range_start, range_end, header))
+        return
+    # Workers need the app registry when started with spawn or forkserver
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+        # Keep a bounded number of ranges in flight so parsed rows cannot
+        # pile up in memory faster than the writer inserts them
+        pending = deque(
+            (range_end, executor.submit(parse_byte_range, csv_file_path, range_start, range_end, header))
+            for range_start, range_end in islice(ranges, workers * 2)
+        )
+        while pending:
+            range_end, future = pending.popleft()
+            for next_start, next_end in islice(ranges, 1):
+                pending.append((next_end, executor.submit(parse_byte_range, csv_file_path, next_start, next_end, header)))
+            yield (range_end, *future.result())
+
+
+class VoterWriter:
+    """
+    Applies decoded rows to Voter and counts the diff on an IngestStats.
+
+    An incremental writer compares each row against the stored voter with
+    the same natural key, upserts only rows whose hash changed, and
+    finish() deletes voters missing from the file. A full writer empties
+    the table in start() and inserts every row. A dry-run writer counts
+    the same diff without writing anything.
+    """
+
+    def __init__(self, stats, batch_size=DEFAULT_BATCH_SIZE, incremental=True, dry_run=False):
+        self.stats = stats
+        self.batch_size = batch_size
+        self.incremental = incremental
+        self.dry_run = dry_run
+        self.seen = set()
+        # natural_key -> row_hash for every voter already stored; keys left
+        # over once the whole file has been read belong to voters who
+        # dropped off it.
+        self.existing = {}
+        if incremental:
+            self.existing = dict(Voter.objects.values_list('natural_key', 'row_hash').iterator(chunk_size=batch_size))
+
+    def start(self):
+        if not self.incremental:
+            self.stats.deleted = Voter.objects.count() if self.dry_run else Voter.objects.all().delete()[0]
+
+    def replay(self, values):
+        """Mark rows an interrupted run already committed as seen, without counting or writing them."""
+        for row in values:
+            self.seen.add(row[_NATURAL_KEY])
+            self.existing.pop(row[_NATURAL_KEY], None)
+
+    def write(self, values):
+        stats = self.stats
+        changed = []
+        for row in values:
+            natural_key = row[_NATURAL_KEY]
+            if natural_key in self.seen:
+                stats.duplicates += 1
+                continue
+            self.seen.add(natural_key)
+            old_hash = self.existing.pop(natural_key, None)
+            if old_hash is None:
+                stats.inserted += 1
+            elif old_hash != row[_ROW_HASH]:
+                stats.updated += 1
+            else:
+                stats.unchanged += 1
+                continue
+            changed.append(row)
+        if self.dry_run:
+            return
+        for chunk in chunked(changed, self.batch_size):
+            voters = [Voter(**dict(zip(PARSED_FIELDS, row))) for row in chunk]
+            if self.incremental:
+                Voter.objects.bulk_create(
+                    voters,
+                    update_conflicts=True,
+                    unique_fields=['natural_key'],
+                    update_fields=[*DATA_FIELDS, 'participation', 'row_hash'],
+                )
+            else:
+                Voter.objects.bulk_create(voters)
+
+    def finish(self):
+        if self.dry_run:
+            self.stats.deleted += len(self.existing)
+            return
+        for stale in chunked(self.existing, self.batch_size):
+            self.stats.deleted += Voter.objects.filter(natural_key__in=stale).delete()[0]
+
+
+def analyze_voters():
+    """Refresh the query planner's statistics for Voter after a bulk change."""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(Voter._meta.db_table)}')
+
+
+def ingest_voters(csv_file_path, batch_size=DEFAULT_BATCH_SIZE, report=print, incremental=True, workers=1,
+                  dry_run=False, checkpoint=None):
+    """
+    Stream the voter CSV into the database.
+
+    The file is read and decoded a byte range at a time, and changed rows
+    are written with one bulk_create per `batch_size` rows, so memory use
+    does not depend on the size of the file. With `workers` > 1, decoding
+    is spread over that many processes while this process stays the only
+    writer.
+
+    An incremental load only upserts rows whose hash changed and deletes
+    voters missing from the file; a full load replaces the table. A dry
+    run reports the same diff without writing.
+
+    Without a checkpoint the whole load runs in one transaction. With an
+    ImportCheckpoint, each byte range is committed together with the
+    checkpoint's new offset, and a checkpoint left part-way by an
+    interrupted run resumes after its last committed range.
+
+    Any load that changes Voter then rebuilds the VoterRollup table and
+    the name search index and bumps DataVersion in one transaction, which
+    invalidates everything cached from the previous data.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    stats = IngestStats()
+    writer = VoterWriter(stats, batch_size, incremental, dry_run)
+    resumed = checkpoint is not None and checkpoint.byte_offset > 0
+    with transaction.atomic() if checkpoint is None else nullcontext():
+        if resumed:
+            # Re-read what the interrupted run committed, to know which
+            # voters are already in the file
+            for _, _, values, _ in parsed_ranges(csv_file_path, workers, stop=checkpoint.byte_offset):
+                writer.replay(values)
+            line_offset = checkpoint.line_number
+            if report:
+                report(f'resuming at line {line_offset + 1} after {checkpoint.rows_committed} committed rows')
+        else:
+            line_offset = 1
+            with transaction.atomic():
+                writer.start()
+                if checkpoint is not None:
+                    checkpoint.byte_offset = data_offset(csv_file_path)
+                    checkpoint.save()
+        start = checkpoint.byte_offset if checkpoint is not None else None
+        for end, lines, values, errors in parsed_ranges(csv_file_path, workers, start=start):
+            for line_number, message in errors:
+                stats.record_error(RowError(line_offset + line_number, message))
+            line_offset += lines
+            stats.rows += len(values) + len(errors)
+            with transaction.atomic():
+                writer.write(values)
+                if checkpoint is not None:
+                    checkpoint.byte_offset = end
+                    checkpoint.line_number = line_offset
+                    checkpoint.rows_committed += len(values) + len(errors)
+                    checkpoint.save()
+            if report:
+                report(f'... {stats.rows} rows ({stats.rows_per_second:,.0f} rows/sec)')
+        with transaction.atomic():
+            writer.finish()
+            # An interrupted run may have committed changes this one did not see
+            if not dry_run and (stats.changed or resumed):
+                rebuild_rollup()
+                rebuild_search_index()
+                DataVersion.bump()
+            if checkpoint is not None:
+                checkpoint.completed = timezone.now()
+                checkpoint.save()
+    if not dry_run and (stats.changed or resumed):
+        # Without fresh statistics SQLite assumes every index is selective,
+        # and picks e.g. the participation index for a 50% match
+        analyze_voters()
+    stats.finished = time.perf_counter()
+    if report:
+        for error in stats.errors:
+            report(f'skipped {error}')
+        report(str(stats))
+    return stats
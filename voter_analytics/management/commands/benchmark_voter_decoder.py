@@ -0,0 +1,73 @@
+import csv
+import os
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voter_analytics.benchmark import write_voter_csv
+from voter_analytics.ingest import PARSED_FIELDS, RowDecoder, natural_key_for, parse_date, row_hash_for
+from voter_analytics.models import ELECTION_BITS, ELECTION_FIELDS
+
+
+def dictreader_rows(path):
+    """The previous decoding path: a dict per row, strptime for both dates and a stripped compare per election."""
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            elections = {field: row[field].strip() == 'TRUE' for field in ELECTION_FIELDS}
+            voter = SimpleNamespace(
+                last_name=row['Last Name'],
+                first_name=row['First Name'],
+                date_of_birth=datetime.strptime(row['Date of Birth'], '%Y-%m-%d').date(),
+                date_of_registration=datetime.strptime(row['Date of Registration'], '%Y-%m-%d').date(),
+                party_affiliation=row['Party Affiliation'],
+                precinct_number=row['Precinct Number'],
+                street_number=row['Residential Address - Street Number'],
+                street_name=row['Residential Address - Street Name'],
+                apartment_number=(row.get('Residential Address - Apartment Number') or '').strip() or None,
+                zip_code=row['Residential Address - Zip Code'],
+                voter_score=int(row['voter_score']),
+                participation=sum(ELECTION_BITS[field] for field, voted in elections.items() if voted),
+                **elections,
+            )
+            voter.natural_key = natural_key_for(voter)
+            voter.row_hash = row_hash_for(voter)
+            yield tuple(getattr(voter, field) for field in PARSED_FIELDS)
+
+
+def decoder_rows(path):
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        decoder = RowDecoder(next(reader))
+        for record in reader:
+            yield decoder.decode(reader.line_num, record)
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-row cost of the DictReader/strptime voter parsing and the RowDecoder.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000)
+        parser.add_argument('--repeat', type=int, default=3, help='Timed passes per decoder; the best is kept.')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'voters.csv')
+            write_voter_csv(path, rows)
+            if list(dictreader_rows(path)) != list(decoder_rows(path)):
+                raise CommandError('RowDecoder output differs from the DictReader path.')
+            for name, decode in [('DictReader + strptime', dictreader_rows), ('RowDecoder', decoder_rows)]:
+                best = None
+                for _ in range(options['repeat']):
+                    parse_date.cache_clear()
+                    start = time.perf_counter()
+                    for _ in decode(path):
+                        pass
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                self.stdout.write(f'  {name:24} {best * 1e6 / rows:6.2f} us/row  ({rows / best:,.0f} rows/sec)')
+            info = parse_date.cache_info()
+            self.stdout.write(f'  date cache: {info.hits:,} hits, {info.misses:,} misses')
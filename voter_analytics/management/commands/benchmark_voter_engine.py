@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from voter_analytics.aggregates import chart_data
+from voter_analytics.benchmark import populate_voters, scratch_database, time_calls
+from voter_analytics.engine import ColumnarVoters
+from voter_analytics.filters import VoterFilter
+from voter_analytics.models import Voter, VoterRollup
+from voter_analytics.rollup import rebuild_rollup, rollup_chart_data
+
+# GraphsView query strings to answer with each engine.
+SCENARIOS = {
+    'no filter': '',
+    'party': 'party_affiliation=D+',
+    'party + birth years': 'party_affiliation=U+&min_dob=1950&max_dob=1970',
+    'score + elections': 'voter_score=3&elections=v21town&elections=v23town',
+    'any election': 'elections=v20state&elections=v22general&election_match=any',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare GraphsView chart latency on the ORM, the VoterRollup table and the NumPy engine.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query.')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        for size in options['sizes']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{size:,} synthetic voters'))
+            with scratch_database():
+                populate_voters(size)
+                rebuild_rollup()
+                start = time.perf_counter()
+                engine = ColumnarVoters(version=0)
+                self.stdout.write(f'  numpy engine loaded in {time.perf_counter() - start:.2f}s')
+                for name, query in SCENARIOS.items():
+                    voter_filter = VoterFilter.from_params(QueryDict(query))
+                    expected = chart_data(Voter.objects.filter(voter_filter.q()))
+                    if engine.chart_data(voter_filter) != expected:
+                        self.stderr.write(f'  {name}: numpy result differs from the ORM')
+                    self.stdout.write(f'  {name}')
+                    for label, func in [
+                        ('orm', lambda: chart_data(Voter.objects.filter(voter_filter.q()))),
+                        ('rollup', lambda: rollup_chart_data(VoterRollup.objects.filter(voter_filter.rollup_q()))),
+                        ('numpy', lambda: engine.chart_data(voter_filter)),
+                    ]:
+                        p50, p95 = time_calls(func, repeat)
+                        self.stdout.write(f'   {label:7} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms')
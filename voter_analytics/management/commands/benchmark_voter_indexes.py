@@ -0,0 +1,71 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from voter_analytics.benchmark import populate_voters, query_plan, scratch_database, time_calls
+from voter_analytics.models import ELECTION_BITS, Voter, masks_with_all
+from voter_analytics.pagination import KeysetPaginator
+from voter_analytics.views import VoterListView
+
+# Filter combinations a VoterListView page is typically asked for.
+SCENARIOS = {
+    'party': {'party_affiliation': 'R '},
+    'party + birth years': {
+        'party_affiliation': 'D ',
+        'date_of_birth__gte': date(1950, 1, 1),
+        'date_of_birth__lte': date(1960, 12, 31),
+    },
+    'score': {'voter_score': 5},
+    'party + score': {'party_affiliation': 'U ', 'voter_score': 1},
+    'birth years + election': {
+        'date_of_birth__gte': date(1980, 1, 1),
+        'date_of_birth__lte': date(1989, 12, 31),
+        'participation__in': masks_with_all(ELECTION_BITS['v22general']),
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare VoterListView query plans and latency with and without the Voter indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=30, help='Timed runs per query.')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{size:,} synthetic voters'))
+            with scratch_database():
+                populate_voters(size)
+                indexed = self.measure(options['repeat'])
+                with connection.schema_editor() as schema_editor:
+                    for index in Voter._meta.indexes:
+                        schema_editor.remove_index(Voter, index)
+                unindexed = self.measure(options['repeat'])
+            for name in SCENARIOS:
+                before, after = unindexed[name], indexed[name]
+                self.stdout.write(f'  {name}')
+                self.stdout.write(f'   without indexes: p50 {before[0]:8.2f} ms  p95 {before[1]:8.2f} ms')
+                self.stdout.write(before[2])
+                self.stdout.write(f'   with indexes:    p50 {after[0]:8.2f} ms  p95 {after[1]:8.2f} ms')
+                self.stdout.write(after[2])
+
+    def measure(self, repeat):
+        """
+        Time the first list page per scenario as VoterListView builds it:
+        the first rows in the view's name order plus the bounded count.
+        """
+        results = {}
+        for name, filters in SCENARIOS.items():
+            queryset = Voter.objects.filter(**filters)
+
+            def list_page():
+                paginator = KeysetPaginator(queryset, VoterListView.paginate_by, VoterListView.ordering)
+                list(paginator.page())
+                paginator.count
+
+            p50, p95 = time_calls(list_page, repeat)
+            paginator = KeysetPaginator(queryset, VoterListView.paginate_by, VoterListView.ordering)
+            results[name] = (p50, p95, query_plan(paginator.queryset[:paginator.per_page + 1]))
+        return results
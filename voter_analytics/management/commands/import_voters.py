@@ -0,0 +1,56 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from voter_analytics.ingest import DEFAULT_BATCH_SIZE, RowError, file_hash, ingest_voters
+from voter_analytics.models import ImportCheckpoint
+
+
+class Command(BaseCommand):
+    help = 'Import the voter CSV, resuming an interrupted import of the same file where it stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=os.path.join(settings.BASE_DIR, 'newton_voters.csv'))
+        parser.add_argument('--full', action='store_true',
+                            help='Replace every voter instead of upserting changed rows.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate the file and report the changes without writing them.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint of an interrupted import and start over.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=1, help='Processes decoding the file.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'{path} does not exist.')
+        incremental = not options['full']
+        checkpoint = None
+        if not options['dry_run']:
+            digest = file_hash(path)
+            unfinished = ImportCheckpoint.objects.filter(file_hash=digest, incremental=incremental,
+                                                         completed__isnull=True)
+            if options['restart']:
+                unfinished.delete()
+            checkpoint = unfinished.order_by('-started').first()
+            if checkpoint is None:
+                checkpoint = ImportCheckpoint.objects.create(file_hash=digest, path=path, incremental=incremental)
+        try:
+            stats = ingest_voters(
+                path,
+                batch_size=options['batch_size'],
+                report=self.stdout.write,
+                incremental=incremental,
+                workers=options['workers'],
+                dry_run=options['dry_run'],
+                checkpoint=checkpoint,
+            )
+        except RowError as e:
+            raise CommandError(str(e))
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: nothing was written.'))
+        elif stats.skipped:
+            self.stdout.write(self.style.WARNING(f'Imported with {stats.skipped} invalid rows skipped.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Import complete.'))
@@ -0,0 +1,79 @@
+import hashlib
+
+from django.db import migrations, models
+
+# Frozen copies of voter_analytics.ingest as of this migration; the hashes
+# must keep matching what later imports compute.
+NATURAL_KEY_FIELDS = [
+    'last_name', 'first_name', 'date_of_birth',
+    'street_number', 'street_name', 'apartment_number', 'zip_code',
+]
+DATA_FIELDS = [
+    'last_name', 'first_name', 'date_of_birth', 'date_of_registration',
+    'party_affiliation', 'precinct_number',
+    'street_number', 'street_name', 'apartment_number', 'zip_code',
+    'v20state', 'v21town', 'v21primary', 'v22general', 'v23town', 'voter_score',
+]
+
+
+def _digest(values):
+    text = '\x1f'.join('' if value is None else str(value) for value in values)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def natural_key_for(voter):
+    return _digest(str(getattr(voter, field) or '').strip().upper() for field in NATURAL_KEY_FIELDS)
+
+
+def row_hash_for(voter):
+    return _digest(getattr(voter, field) for field in DATA_FIELDS)
+
+
+def fingerprint_voters(apps, schema_editor):
+    # Earlier loads appended a fresh copy of every voter on each run; keep
+    # the oldest row for each natural key and drop the rest.
+    Voter = apps.get_model('voter_analytics', 'Voter')
+    seen = set()
+    duplicates = []
+    batch = []
+    for voter in Voter.objects.order_by('id').iterator(chunk_size=2000):
+        voter.natural_key = natural_key_for(voter)
+        if voter.natural_key in seen:
+            duplicates.append(voter.pk)
+            continue
+        seen.add(voter.natural_key)
+        voter.row_hash = row_hash_for(voter)
+        batch.append(voter)
+        if len(batch) >= 2000:
+            Voter.objects.bulk_update(batch, ['natural_key', 'row_hash'])
+            batch = []
+    Voter.objects.bulk_update(batch, ['natural_key', 'row_hash'])
+    for start in range(0, len(duplicates), 2000):
+        Voter.objects.filter(pk__in=duplicates[start:start + 2000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0002_alter_voter_date_of_birth_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voter',
+            name='natural_key',
+            field=models.CharField(max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='row_hash',
+            field=models.CharField(default='', max_length=32),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fingerprint_voters, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='voter',
+            name='natural_key',
+            field=models.CharField(max_length=32, unique=True),
+        ),
+    ]
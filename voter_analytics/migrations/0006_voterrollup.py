@@ -0,0 +1,51 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:05
+
+from functools import reduce
+from operator import add
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+
+
+def build_rollup(apps, schema_editor):
+    Voter = apps.get_model('voter_analytics', 'Voter')
+    VoterRollup = apps.get_model('voter_analytics', 'VoterRollup')
+    fields = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
+    participation = reduce(add, [
+        models.Case(models.When(**{field: True}, then=models.Value(1 << i)), default=models.Value(0),
+                    output_field=models.IntegerField())
+        for i, field in enumerate(fields)
+    ])
+    groups = (
+        Voter.objects.order_by()
+        .annotate(birth_year=ExtractYear('date_of_birth'), participation=participation)
+        .values('party_affiliation', 'birth_year', 'voter_score', 'participation')
+        .annotate(voters=Count('pk'))
+    )
+    VoterRollup.objects.bulk_create([VoterRollup(**group) for group in groups], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0005_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoterRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('party_affiliation', models.CharField(max_length=50)),
+                ('birth_year', models.PositiveSmallIntegerField()),
+                ('voter_score', models.IntegerField()),
+                ('participation', models.PositiveSmallIntegerField()),
+                ('voters', models.PositiveIntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('party_affiliation', 'birth_year', 'voter_score', 'participation'), name='voter_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:10
+
+from functools import reduce
+from operator import add
+
+from django.db import migrations, models
+
+
+def fill_participation(apps, schema_editor):
+    # One UPDATE packing the five booleans into the new bitmask column
+    Voter = apps.get_model('voter_analytics', 'Voter')
+    fields = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
+    Voter.objects.update(participation=reduce(add, [
+        models.Case(models.When(**{field: True}, then=models.Value(1 << i)), default=models.Value(0),
+                    output_field=models.IntegerField())
+        for i, field in enumerate(fields)
+    ]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0007_voter_name_order_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='voter',
+            name='voter_elections_idx',
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='participation',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_participation, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['participation'], name='voter_participation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['party_affiliation', 'participation'], name='voter_party_participation_idx'),
+        ),
+    ]
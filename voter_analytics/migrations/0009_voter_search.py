@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # SQLite only: an external-content FTS5 table reading its rows from
+    # voter_analytics_voter, with prefix indexes for 2 and 3 letter
+    # prefixes, and a vocabulary table for typo correction.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE voter_analytics_voter_search USING fts5("
+        "last_name, first_name, street_number, street_name, "
+        "content='voter_analytics_voter', content_rowid='id', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE voter_analytics_voter_search_vocab "
+        "USING fts5vocab(voter_analytics_voter_search, 'row')"
+    )
+    schema_editor.execute("INSERT INTO voter_analytics_voter_search(voter_analytics_voter_search) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE voter_analytics_voter_search_vocab')
+    schema_editor.execute('DROP TABLE voter_analytics_voter_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0008_voter_participation'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0009_voter_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_hash', models.CharField(max_length=64)),
+                ('path', models.CharField(max_length=500)),
+                ('incremental', models.BooleanField(default=True)),
+                ('byte_offset', models.BigIntegerField(default=0)),
+                ('line_number', models.PositiveIntegerField(default=1)),
+                ('rows_committed', models.PositiveIntegerField(default=0)),
+                ('started', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('completed', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['file_hash', 'completed'], name='import_checkpoint_file_idx')],
+            },
+        ),
+    ]
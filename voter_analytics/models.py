@@ -1,9 +1,24 @@
 from django.db import models
-import csv
-from datetime import datetime
 from django.conf import settings
+from django.utils import timezone
 import os
 
+# Election participation columns on Voter, in chronological order.
+ELECTION_FIELDS = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
+
+# Bit for each election in a participation bitmask.
+ELECTION_BITS = {field: 1 << i for i, field in enumerate(ELECTION_FIELDS)}
+
+
+def masks_with_all(required):
+    """Every participation bitmask that includes all the bits in `required`."""
+    return [mask for mask in range(1 << len(ELECTION_FIELDS)) if mask & required == required]
+
+
+def masks_with_any(required):
+    """Every participation bitmask that shares at least one bit with `required`."""
+    return [mask for mask in range(1 << len(ELECTION_FIELDS)) if mask & required]
+
 class Voter(models.Model):
     # Personal Information
     last_name = models.CharField(max_length=100)
@@ -26,44 +41,109 @@ class Voter(models.Model):
     v22general = models.BooleanField()
     v23town = models.BooleanField()
     voter_score = models.IntegerField()
+    # The five election booleans packed into one bitmask (see ELECTION_BITS),
+    # so any election filter is a single indexed participation IN (...)
+    participation = models.PositiveSmallIntegerField(default=0)
+
+    # Import fingerprints: natural_key identifies the person (name + DOB +
+    # address) across voter files, row_hash changes whenever any field does.
+    natural_key = models.CharField(max_length=32, unique=True)
+    row_hash = models.CharField(max_length=32)
+
+    class Meta:
+        # Matched to the VoterListView/GraphsView filters: party, birth-date
+        # range and score, alone or combined, plus the election columns.
+        indexes = [
+            models.Index(fields=['date_of_birth'], name='voter_dob_idx'),
+            models.Index(fields=['party_affiliation', 'date_of_birth'], name='voter_party_dob_idx'),
+            models.Index(fields=['party_affiliation', 'voter_score'], name='voter_party_score_idx'),
+            models.Index(fields=['voter_score', 'date_of_birth'], name='voter_score_dob_idx'),
+            models.Index(fields=['participation'], name='voter_participation_idx'),
+            models.Index(fields=['party_affiliation', 'participation'], name='voter_party_participation_idx'),
+            # Sort key for keyset pagination of the voter list, unfiltered
+            # and within a party
+            models.Index(fields=['last_name', 'first_name', 'id'], name='voter_name_order_idx'),
+            models.Index(fields=['party_affiliation', 'last_name', 'first_name', 'id'], name='voter_party_name_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - Precinct {self.precinct_number}"
-def load_data():
-    csv_file_path = os.path.join(settings.BASE_DIR, 'newton_voters.csv')
 
-    with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        voters = []
-        for row in reader:
-            #print(f'Processing row: {row}')
-            date_of_birth = datetime.strptime(row['Date of Birth'], '%Y-%m-%d').date()
-            date_of_registration = datetime.strptime(row['Date of Registration'], '%Y-%m-%d').date()
-
-            v20state = row['v20state'].strip() == 'TRUE'
-            v21town = row['v21town'].strip() == 'TRUE'
-            v21primary = row['v21primary'].strip() == 'TRUE'
-            v22general = row['v22general'].strip() == 'TRUE'
-            v23town = row['v23town'].strip() == 'TRUE'
-
-            # Create Voter instance
-            voter = Voter(
-                last_name=row['Last Name'],
-                first_name=row['First Name'],
-                date_of_birth=date_of_birth,
-                date_of_registration=date_of_registration,
-                party_affiliation=row['Party Affiliation'],
-                precinct_number=row['Precinct Number'],
-                street_number=row['Residential Address - Street Number'],
-                street_name=row['Residential Address - Street Name'],
-                apartment_number=row.get('Residential Address - Apartment Number', '').strip() or None,
-                zip_code=row['Residential Address - Zip Code'],
-                v20state=v20state,
-                v21town=v21town,
-                v21primary=v21primary,
-                v22general=v22general,
-                v23town=v23town,
-                voter_score=int(row['voter_score']),
-            )
-            #print(f'Created result: {voter}')
-            voter.save()
\ No newline at end of file
+    def get_participation(self):
+        return sum(bit for field, bit in ELECTION_BITS.items() if getattr(self, field))
+
+    def save(self, *args, **kwargs):
+        # Keep the bitmask in step with the booleans on every save
+        self.participation = self.get_participation()
+        super().save(*args, **kwargs)
+
+
+class VoterRollup(models.Model):
+    # Voter counts pre-aggregated by everything GraphsView can filter or
+    # chart on, rebuilt at the end of each import. Its size depends on the
+    # number of distinct combinations, not on the number of voters.
+    party_affiliation = models.CharField(max_length=50)
+    birth_year = models.PositiveSmallIntegerField()
+    voter_score = models.IntegerField()
+    participation = models.PositiveSmallIntegerField()
+    voters = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['party_affiliation', 'birth_year', 'voter_score', 'participation'],
+                name='voter_rollup_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.party_affiliation} {self.birth_year} score {self.voter_score}: {self.voters}"
+
+
+class DataVersion(models.Model):
+    # Single row bumped by every import that changes Voter. Cached facets,
+    # aggregates and figures are keyed on it, so they go stale together.
+    version = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        cls.objects.get_or_create(pk=1)
+        cls.objects.filter(pk=1).update(version=models.F('version') + 1, updated=timezone.now())
+        return cls.current()
+
+
+class ImportCheckpoint(models.Model):
+    # Progress of one resumable voter import (manage.py import_voters),
+    # saved in the same transaction as each committed range of rows.
+    file_hash = models.CharField(max_length=64)
+    path = models.CharField(max_length=500)
+    incremental = models.BooleanField(default=True)
+    # Byte offset just past the last committed row, 0 before the import
+    # has started, and the file line it ends on
+    byte_offset = models.BigIntegerField(default=0)
+    line_number = models.PositiveIntegerField(default=1)
+    rows_committed = models.PositiveIntegerField(default=0)
+    started = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    completed = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['file_hash', 'completed'], name='import_checkpoint_file_idx'),
+        ]
+
+    def __str__(self):
+        state = 'completed' if self.completed else f'at line {self.line_number}'
+        return f"{self.path} ({self.rows_committed} rows, {state})"
+
+
+def load_data(batch_size=None, incremental=True, workers=1):
+    csv_file_path = os.path.join(settings.BASE_DIR, 'newton_voters.csv')
+    # Imported here because the ingest module itself imports Voter.
+    from .ingest import ingest_voters
+    return ingest_voters(csv_file_path, batch_size=batch_size, incremental=incremental, workers=workers)
@@ -0,0 +1,34 @@
+from django.db import models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractYear
+
+from .aggregates import fold_groups
+from .models import ELECTION_BITS, ELECTION_FIELDS, Voter, VoterRollup, masks_with_all
+
+
+def rebuild_rollup(voter_model=Voter, rollup_model=VoterRollup):
+    """Replace the rollup with a fresh GROUP BY over every voter."""
+    groups = (
+        voter_model.objects.order_by()
+        .annotate(birth_year=ExtractYear('date_of_birth'))
+        .values('party_affiliation', 'birth_year', 'voter_score', 'participation')
+        .annotate(voters=Count('pk'))
+    )
+    rollup_model.objects.all().delete()
+    rollup_model.objects.bulk_create([rollup_model(**group) for group in groups.iterator()], batch_size=2000)
+
+
+def rollup_chart_data(rollups):
+    """chart_data() for a filtered VoterRollup queryset, from one GROUP BY over the rollup."""
+    groups = (
+        rollups.order_by()
+        .values('party_affiliation', year=models.F('birth_year'))
+        .annotate(
+            count=Sum('voters'),
+            **{
+                field: Sum('voters', filter=Q(participation__in=masks_with_all(ELECTION_BITS[field])), default=0)
+                for field in ELECTION_FIELDS
+            },
+        )
+    )
+    return fold_groups(groups)
@@ -0,0 +1,92 @@
+import difflib
+import re
+from functools import lru_cache, reduce
+from operator import and_
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import DataVersion
+
+# SQLite FTS5 index over the voter name and street columns, created by
+# migration 0009 with Voter as its external content table.
+SEARCH_TABLE = 'voter_analytics_voter_search'
+SEARCH_VOCAB_TABLE = 'voter_analytics_voter_search_vocab'
+SEARCH_FIELDS = ['last_name', 'first_name', 'street_number', 'street_name']
+
+# Search terms beyond this are ignored.
+MAX_TERMS = 6
+
+
+def search_index_available():
+    """The FTS5 index only exists on SQLite; other backends fall back to istartswith."""
+    return connection.vendor == 'sqlite'
+
+
+def rebuild_search_index():
+    """Re-read every Voter row into the FTS5 index after a bulk change."""
+    if search_index_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def search_terms(text):
+    """Lower-cased words of a search box query, split the way the FTS5 tokenizer splits them."""
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def _has_prefix(cursor, term):
+    cursor.execute(f'SELECT 1 FROM {SEARCH_VOCAB_TABLE} WHERE term >= %s AND term < %s LIMIT 1',
+                   [term, term + '\uffff'])
+    return cursor.fetchone() is not None
+
+
+@lru_cache(maxsize=1024)
+def close_terms(version, term):
+    """
+    Indexed words within a typo or two of `term`, for terms that match
+    nothing as typed. Only words with the same first letter and a similar
+    length are compared, which keeps the candidate list to a small slice of
+    the vocabulary. Cached per data version.
+    """
+    with connection.cursor() as cursor:
+        if _has_prefix(cursor, term):
+            return ()
+        cursor.execute(
+            f'SELECT term FROM {SEARCH_VOCAB_TABLE} WHERE term >= %s AND term < %s AND length(term) BETWEEN %s AND %s',
+            [term[0], term[0] + '\uffff', len(term) - 2, len(term) + 2],
+        )
+        candidates = [row[0] for row in cursor.fetchall()]
+    return tuple(difflib.get_close_matches(term, candidates, n=5, cutoff=0.65))
+
+
+def match_expression(terms, version):
+    """
+    FTS5 MATCH query requiring every term, each as a prefix; a term with no
+    prefix match is replaced by the indexed words closest to it.
+    """
+    clauses = []
+    for term in terms:
+        alternatives = close_terms(version, term)
+        if alternatives:
+            clauses.append('(' + ' OR '.join(f'"{word}"' for word in alternatives) + ')')
+        else:
+            clauses.append(f'"{term}"*')
+    return ' AND '.join(clauses)
+
+
+def search_voters(queryset, text):
+    """Narrow a Voter queryset to the voters whose name or street matches `text`."""
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+    if not search_index_available():
+        return queryset.filter(reduce(and_, [
+            reduce(Q.__or__, [Q(**{f'{field}__istartswith': term}) for field in SEARCH_FIELDS])
+            for term in terms
+        ]))
+    expression = match_expression(terms, DataVersion.current())
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression],
+    ))
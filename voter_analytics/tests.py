@@ -1,3 +1,414 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Sum
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from cs412.testing import TEST_STORAGES
+
+from . import aggregates
+from .benchmark import populate_voters, write_voter_csv
+from .engine import ColumnarVoters, np
+from .filters import VoterFilter
+from .ingest import DATA_FIELDS, VoterWriter, data_offset, file_hash, ingest_voters
+from .models import ELECTION_FIELDS, DataVersion, ImportCheckpoint, Voter, VoterRollup
+from .rollup import rebuild_rollup
+from .search import close_terms, rebuild_search_index
+from .views import VoterExportView
+
+# Position of each field in a voter file row, after the ID column
+COLUMN = {field: i + 1 for i, field in enumerate(DATA_FIELDS)}
+
+def cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class VoterListPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        populate_voters(30)
+
+    def test_tampered_cursor_is_not_found(self):
+        for key in (['a', 'b', 'c'], ['a', 'b', None], ['a', 'b', []], ['a', 'b'], 'abc'):
+            with self.subTest(key=key):
+                response = self.client.get(reverse('voters'), {'after': cursor(key)})
+                self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get(reverse('voters'), {'after': cursor(['a', 'b', 1])}).status_code, 200)
+
+
+class IngestTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'voters.csv')
+        write_voter_csv(self.path, 20)
+        with open(self.path, newline='', encoding='utf-8') as f:
+            self.header, *self.rows = csv.reader(f)
+
+    def rewrite(self, rows):
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows([self.header, *rows])
+
+    def ingest(self, **kwargs):
+        return ingest_voters(self.path, report=None, **kwargs)
+
+    def test_first_import_inserts_every_row(self):
+        stats = self.ingest()
+        self.assertEqual((stats.rows, stats.inserted, stats.skipped), (20, 20, 0))
+        self.assertEqual(Voter.objects.count(), 20)
+
+    def test_reimport_applies_only_the_diff(self):
+        self.ingest()
+        ids = dict(Voter.objects.values_list('natural_key', 'pk'))
+        self.assertEqual(self.ingest().changed, 0)
+
+        rows = [list(row) for row in self.rows]
+        rows[0][COLUMN['party_affiliation']] = 'Q '
+        removed = rows.pop()
+        added = list(rows[1])
+        added[COLUMN['last_name']] = 'NEWCOMER'
+        rows.append(added)
+        self.rewrite(rows)
+        stats = self.ingest()
+        self.assertEqual((stats.inserted, stats.updated, stats.unchanged, stats.deleted), (1, 1, 18, 1))
+        self.assertEqual(Voter.objects.count(), 20)
+        changed = Voter.objects.get(last_name=rows[0][COLUMN['last_name']], first_name=rows[0][COLUMN['first_name']],
+                                    street_name=rows[0][COLUMN['street_name']])
+        self.assertEqual(changed.party_affiliation, 'Q ')
+        self.assertTrue(Voter.objects.filter(last_name='NEWCOMER').exists())
+        self.assertFalse(Voter.objects.filter(last_name=removed[COLUMN['last_name']],
+                                              street_name=removed[COLUMN['street_name']]).exists())
+        # Unchanged voters keep their rows
+        kept = Voter.objects.get(last_name=rows[2][COLUMN['last_name']], street_name=rows[2][COLUMN['street_name']])
+        self.assertEqual(kept.pk, ids[kept.natural_key])
+
+    def test_full_reload_replaces_every_row(self):
+        self.ingest()
+        self.rewrite(self.rows[:15])
+        stats = self.ingest(incremental=False)
+        self.assertEqual((stats.deleted, stats.inserted), (20, 15))
+        self.assertEqual(Voter.objects.count(), 15)
+
+    def test_bad_row_is_skipped(self):
+        rows = [list(row) for row in self.rows]
+        rows[3][COLUMN['date_of_birth']] = 'yesterday'
+        self.rewrite(rows)
+        stats = self.ingest()
+        self.assertEqual((stats.inserted, stats.skipped), (19, 1))
+
+    def test_parallel_parse_matches_serial(self):
+        write_voter_csv(self.path, 60)
+        with open(self.path, newline='', encoding='utf-8') as f:
+            self.header, *rows = csv.reader(f)
+        # Bad rows in the first and a later range; the header is line 1
+        rows[0][COLUMN['date_of_birth']] = 'yesterday'
+        rows[49][COLUMN['voter_score']] = 'many'
+        self.rewrite(rows)
+        results = []
+        with mock.patch('voter_analytics.ingest.CHUNK_BYTES', 500):
+            for workers in (1, 2):
+                stats = self.ingest(incremental=False, workers=workers)
+                results.append((set(Voter.objects.values_list('natural_key', 'row_hash')), stats.errors))
+        (serial, serial_errors), (parallel, parallel_errors) = results
+        self.assertEqual(len(serial), 58)
+        self.assertEqual(parallel, serial)
+        self.assertEqual([error.split(':')[0] for error in parallel_errors], ['line 2', 'line 51'])
+        self.assertEqual(parallel_errors, serial_errors)
+
+    def snapshot(self):
+        return (set(Voter.objects.values_list('natural_key', 'row_hash')),
+                VoterRollup.objects.aggregate(total=Sum('voters'))['total'])
+
+    def edited_rows(self):
+        # Another version of the file: one voter changed, one gone, one new
+        rows = [list(row) for row in self.rows]
+        rows[0][COLUMN['party_affiliation']] = 'Q '
+        rows.pop()
+        added = list(rows[1])
+        added[COLUMN['last_name']] = 'NEWCOMER'
+        return [*rows, added]
+
+    def assertResumes(self, incremental):
+        write_voter_csv(self.path, 60)
+        with open(self.path, newline='', encoding='utf-8') as f:
+            self.header, *self.rows = csv.reader(f)
+        target = self.rows
+        with mock.patch('voter_analytics.ingest.CHUNK_BYTES', 1000):
+            self.ingest(incremental=False)
+            expected = self.snapshot()
+            # Start from an older copy of the file, so the import has
+            # voters to update, insert and delete
+            self.rewrite(self.edited_rows())
+            self.ingest(incremental=False)
+            self.rewrite(target)
+
+            checkpoint = ImportCheckpoint.objects.create(file_hash=file_hash(self.path), path=self.path,
+                                                         incremental=incremental)
+            write = VoterWriter.write
+            written = []
+
+            def write_then_crash(writer, values):
+                if written:
+                    raise RuntimeError('import killed')
+                written.append(len(values))
+                write(writer, values)
+
+            with mock.patch.object(VoterWriter, 'write', write_then_crash), self.assertRaises(RuntimeError):
+                self.ingest(incremental=incremental, checkpoint=checkpoint)
+            checkpoint.refresh_from_db()
+            self.assertGreater(checkpoint.byte_offset, data_offset(self.path))
+            self.assertEqual(checkpoint.rows_committed, written[0])
+            self.assertLess(checkpoint.rows_committed, 60)
+            self.assertIsNone(checkpoint.completed)
+
+            self.ingest(incremental=incremental, checkpoint=checkpoint)
+        checkpoint.refresh_from_db()
+        self.assertEqual(self.snapshot(), expected)
+        self.assertEqual(expected[1], 60)
+        self.assertEqual(checkpoint.rows_committed, 60)
+        self.assertEqual(checkpoint.line_number, 61)
+        self.assertIsNotNone(checkpoint.completed)
+
+    def test_incremental_import_resumes_after_a_crash(self):
+        self.assertResumes(incremental=True)
+
+    def test_full_import_resumes_after_a_crash(self):
+        # Resuming must not empty the table again and lose the rows
+        # committed before the crash
+        self.assertResumes(incremental=False)
+
+    def assertDryRunMatches(self, incremental):
+        self.ingest()
+        before = (self.snapshot(), list(VoterRollup.objects.values_list('pk', 'voters')), DataVersion.current())
+        self.rewrite(self.edited_rows())
+        dry_run = self.ingest(incremental=incremental, dry_run=True)
+        self.assertEqual((self.snapshot(), list(VoterRollup.objects.values_list('pk', 'voters')),
+                          DataVersion.current()), before)
+        stats = self.ingest(incremental=incremental)
+        diff = ('inserted', 'updated', 'unchanged', 'deleted', 'duplicates', 'skipped')
+        self.assertEqual([getattr(dry_run, name) for name in diff], [getattr(stats, name) for name in diff])
+        self.assertGreater(DataVersion.current(), before[2])
+
+    def test_incremental_dry_run_writes_nothing(self):
+        self.assertDryRunMatches(incremental=True)
+
+    def test_full_dry_run_writes_nothing(self):
+        self.assertDryRunMatches(incremental=False)
+
+    def test_dry_run_command(self):
+        self.ingest()
+        before = self.snapshot()
+        self.rewrite(self.edited_rows())
+        out = StringIO()
+        call_command('import_voters', self.path, '--dry-run', stdout=out)
+        self.assertIn('1 inserted, 1 updated, 18 unchanged, 1 deleted', out.getvalue())
+        self.assertIn('Dry run: nothing was written.', out.getvalue())
+        self.assertEqual(self.snapshot(), before)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+
+class FingerprintMigrationTests(TransactionTestCase):
+    before = [('voter_analytics', '0002_alter_voter_date_of_birth_and_more')]
+    after = [('voter_analytics', '0003_voter_natural_key_voter_row_hash')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_voters_are_dropped(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        OldVoter = executor.loader.project_state(self.before).apps.get_model('voter_analytics', 'Voter')
+        voter = dict(
+            last_name='Smith', first_name='Ann', date_of_birth='1970-01-01', date_of_registration='2000-01-01',
+            party_affiliation='D ', precinct_number='1A', street_number='1', street_name='ELM',
+            zip_code='02458', v20state=True, v21town=False, v21primary=False, v22general=True,
+            v23town=False, voter_score=2,
+        )
+        first = OldVoter.objects.create(**voter)
+        # The same voter loaded again, spelled with different case and spacing
+        OldVoter.objects.create(**{**voter, 'last_name': ' SMITH', 'first_name': 'ann'})
+        other = OldVoter.objects.create(**{**voter, 'street_number': '2'})
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        NewVoter = executor.loader.project_state(self.after).apps.get_model('voter_analytics', 'Voter')
+        self.assertEqual(sorted(NewVoter.objects.values_list('pk', flat=True)), [first.pk, other.pk])
+        self.assertEqual(len(set(NewVoter.objects.values_list('row_hash', flat=True))), 2)
+
+
+def params(query):
+    return VoterFilter.from_params(QueryDict(query))
+
+
+class VoterFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        populate_voters(300)
+        rebuild_rollup()
+
+    def test_from_params_normalises(self):
+        voter_filter = params('elections=v23town&elections=bogus&elections=v20state&elections=v23town'
+                              '&min_dob=abc&max_dob=1990&voter_score=x&party_affiliation=D+')
+        self.assertEqual(voter_filter.elections, ('v20state', 'v23town'))
+        self.assertIsNone(voter_filter.min_year)
+        self.assertEqual(voter_filter.max_year, 1990)
+        self.assertIsNone(voter_filter.voter_score)
+        self.assertEqual(voter_filter.party_affiliation, 'D ')
+        self.assertEqual(voter_filter.election_match, 'all')
+        self.assertIsNone(params('min_dob=99999').min_year)
+        self.assertEqual(params('election_match=nonsense').election_match, 'all')
+
+    def test_equivalent_query_strings_share_a_cache_key(self):
+        same = [
+            'elections=v23town&elections=v20state&max_dob=1990',
+            'max_dob=1990&elections=v20state&elections=v23town&elections=v20state&min_dob=&voter_score=',
+            'elections=v20state&elections=unknown&elections=v23town&max_dob=1990&page=3',
+        ]
+        self.assertEqual(len({params(query).cache_key for query in same}), 1)
+        self.assertNotEqual(params(same[0]).cache_key, params(same[0] + '&election_match=any').cache_key)
+
+    def assertMatches(self, voter_filter, test):
+        expected = sorted(voter.pk for voter in Voter.objects.all() if test(voter))
+        self.assertTrue(0 < len(expected) < Voter.objects.count())
+        self.assertEqual(sorted(Voter.objects.filter(voter_filter.q()).values_list('pk', flat=True)), expected)
+        rollup_total = VoterRollup.objects.filter(voter_filter.rollup_q()).aggregate(total=Sum('voters'))['total']
+        self.assertEqual(rollup_total, len(expected))
+
+    def test_all_elections(self):
+        self.assertMatches(params('elections=v20state&elections=v22general&party_affiliation=U+&min_dob=1950'),
+                           lambda v: v.v20state and v.v22general and v.party_affiliation == 'U '
+                           and v.date_of_birth.year >= 1950)
+
+    def test_any_election(self):
+        self.assertMatches(params('elections=v21town&elections=v23town&election_match=any&voter_score=2'),
+                           lambda v: (v.v21town or v.v23town) and v.voter_score == 2)
+
+    def test_every_election_filter_agrees(self):
+        for field in ELECTION_FIELDS:
+            with self.subTest(field=field):
+                self.assertMatches(params(f'elections={field}&max_dob=1980'),
+                                   lambda v: getattr(v, field) and v.date_of_birth.year <= 1980)
+
+
+def create_fitzgeralds():
+    """Two voters sharing a name, one per party and street, indexed for search."""
+    voter = dict(
+        first_name='Ann', date_of_birth='1970-01-01', date_of_registration='2000-01-01',
+        precinct_number='1A', street_number='12', zip_code='02458', v20state=True, v21town=False,
+        v21primary=False, v22general=True, v23town=False, voter_score=2, row_hash='',
+    )
+    democrat = Voter.objects.create(**voter, last_name='Fitzgerald', party_affiliation='D ',
+                                    street_name='Commonwealth Ave', natural_key='fitzgerald-d')
+    republican = Voter.objects.create(**voter, last_name='Fitzgerald', party_affiliation='R ',
+                                      street_name='Beacon St', natural_key='fitzgerald-r')
+    rebuild_search_index()
+    return democrat, republican
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        populate_voters(50)
+        cls.democrat, cls.republican = create_fitzgeralds()
+
+    def setUp(self):
+        # Typo suggestions are cached per data version, not per test database
+        close_terms.cache_clear()
+
+    def search(self, **query):
+        response = self.client.get(reverse('voters'), query)
+        self.assertEqual(response.status_code, 200)
+        return sorted(voter.pk for voter in response.context['voters'])
+
+    def test_prefix(self):
+        self.assertEqual(self.search(q='fitzg'), [self.democrat.pk, self.republican.pk])
+        self.assertEqual(self.search(q='Fitz commonw'), [self.democrat.pk])
+
+    def test_one_letter_typo(self):
+        self.assertEqual(self.search(q='Fitzgerlad'), [self.democrat.pk, self.republican.pk])
+        self.assertEqual(self.search(q='beakon'), [self.republican.pk])
+
+    def test_search_with_party_filter(self):
+        self.assertEqual(self.search(q='fitzgerald', party_affiliation='R '), [self.republican.pk])
+
+    def test_no_match(self):
+        self.assertEqual(self.search(q='zzyzx'), [])
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        populate_voters(50)
+        cls.democrat, cls.republican = create_fitzgeralds()
+
+    def setUp(self):
+        close_terms.cache_clear()
+
+    def export(self, export_format):
+        response = self.client.get(reverse('export_voters'),
+                                   {'format': export_format, 'q': 'fitzgerald', 'party_affiliation': 'D '})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv(self):
+        header, *rows = csv.reader(StringIO(self.export('csv')))
+        self.assertEqual(header, VoterExportView.fields)
+        self.assertEqual(len(rows), 1)
+        row = dict(zip(header, rows[0]))
+        self.assertEqual((row['id'], row['last_name'], row['party_affiliation']),
+                         (str(self.democrat.pk), 'Fitzgerald', 'D '))
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(list(rows[0]), VoterExportView.fields)
+        self.assertEqual((rows[0]['id'], rows[0]['street_name'], rows[0]['date_of_birth']),
+                         (self.democrat.pk, 'Commonwealth Ave', '1970-01-01'))
+
+    def test_unfiltered_export_has_every_voter(self):
+        response = self.client.get(reverse('export_voters'), {'format': 'ndjson'})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 52)
+
+    def test_unknown_format_is_not_found(self):
+        self.assertEqual(self.client.get(reverse('export_voters'), {'format': 'xml'}).status_code, 404)
+
+
+@skipIf(np is None, 'the numpy engine needs numpy')
+class ColumnarEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        populate_voters(500)
+
+    def test_chart_data_matches_orm(self):
+        engine = ColumnarVoters(0)
+        filters = [
+            VoterFilter(),
+            VoterFilter(elections=('v21town', 'v23town'), election_match='any'),
+            VoterFilter(voter_score=3, min_year=1950, max_year=1979),
+            VoterFilter(party_affiliation='D ', elections=('v20state',)),
+            VoterFilter(party_affiliation='no such party'),
+        ]
+        for voter_filter in filters:
+            with self.subTest(voter_filter=voter_filter):
+                self.assertEqual(engine.chart_data(voter_filter),
+                                 aggregates.chart_data(Voter.objects.filter(voter_filter.q())))
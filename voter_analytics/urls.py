@@ -1,11 +1,16 @@
 # voter_analytics/urls.py
 
 from django.urls import path
-from .views import GraphsView, VoterListView, VoterDetailView
+from .views import (GeographyDataView, GeographyView, GraphDataView, GraphsView, VoterDetailView,
+                    VoterExportView, VoterListView)
 
 urlpatterns = [
     path('', VoterListView.as_view(), name='voters'),  
     path('voter/<int:pk>/', VoterDetailView.as_view(), name='voter'),  
+    path('export/', VoterExportView.as_view(), name='export_voters'),
     path('graphs/', GraphsView.as_view(), name='graphs'),
+    path('graphs/data/', GraphDataView.as_view(), name='graph_data'),
+    path('geography/', GeographyView.as_view(), name='geography'),
+    path('geography/data/', GeographyDataView.as_view(), name='geography_data'),
 
 ]
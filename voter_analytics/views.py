@@ -1,118 +1,170 @@
+import csv
+import json
+from functools import cached_property
+
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from django.views.generic import ListView, DetailView
-from .models import Voter
+from django.views.generic import ListView, DetailView, TemplateView
+from .models import ELECTION_FIELDS, DataVersion, Voter, VoterRollup
+from .rollup import rollup_chart_data
+from .facets import voter_facets
+from .filters import VoterFilter
+from .charts import chart_cache, chart_cache_key
+from .engine import columnar_engine_enabled, columnar_voters
+from .geography import AREA_FIELDS, area_report
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import search_voters
+from .ingest import chunked
+
+
 
-from django.db.models.functions import ExtractYear
-from django.db.models import Count, Q
-import plotly.graph_objs as go
-import plotly.io as pio
+class VoterFilterMixin:
+    # Parses the filter GET parameters once per request
 
+    @cached_property
+    def voter_filter(self):
+        return VoterFilter.from_params(self.request.GET)
 
-class VoterListView(ListView):
+
+class VoterListView(VoterFilterMixin, ListView):
     model = Voter
     template_name = 'voter_analytics/voter_list.html'
     context_object_name = 'voters'
     paginate_by = 100
+    # Stable, indexed sort key for keyset pagination
+    ordering = ['last_name', 'first_name', 'pk']
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        # Get filter parameters
-        party_affiliation = self.request.GET.get('party_affiliation')
-        min_dob = self.request.GET.get('min_dob')
-        max_dob = self.request.GET.get('max_dob')
-        voter_score = self.request.GET.get('voter_score')
-        elections = self.request.GET.getlist('elections')
-
-        # Apply filters
-        if party_affiliation:
-            queryset = queryset.filter(party_affiliation=party_affiliation)
-        if min_dob:
-            queryset = queryset.filter(date_of_birth__year__gte=int(min_dob))
-        if max_dob:
-            queryset = queryset.filter(date_of_birth__year__lte=int(max_dob))
-        if voter_score:
-            queryset = queryset.filter(voter_score=int(voter_score))
-        if elections:
-            for election in elections:
-                filter_kwargs = {election: True}
-                queryset = queryset.filter(**filter_kwargs)
+        queryset = Voter.objects.filter(self.voter_filter.q())
+        # Name / street search box
+        search = self.request.GET.get('q', '').strip()
+        if search:
+            queryset = search_voters(queryset, search)
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        # Seek pagination with cursor tokens instead of OFFSET page numbers;
+        # ?count=exact asks for a full COUNT instead of a bounded one
+        paginator = KeysetPaginator(
+            queryset, page_size, self.ordering,
+            approximate_count=self.request.GET.get('count') != 'exact',
+        )
+        try:
+            page = paginator.page(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Dropdown options
-        context['party_affiliations'] = Voter.objects.values_list('party_affiliation', flat=True).distinct()
-        context['years'] = sorted(set(Voter.objects.values_list('date_of_birth__year', flat=True)))
-        context['voter_scores'] = sorted(set(Voter.objects.values_list('voter_score', flat=True)))
-        context['elections'] = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
+        context.update(voter_facets())
+        # Current filters, for building the previous/next page links
+        params = self.request.GET.copy()
+        for name in ('after', 'before', 'page', 'csrfmiddlewaretoken'):
+            params.pop(name, None)
+        context['filter_query'] = params.urlencode()
         return context
 
+class Echo:
+    # File-like object for csv.writer that hands back each line instead of storing it
+    def write(self, value):
+        return value
+
+
+class VoterExportView(VoterListView):
+    # Streams every voter matching the VoterListView filters as CSV or NDJSON
+    fields = [
+        'id', 'last_name', 'first_name', 'street_number', 'street_name', 'apartment_number', 'zip_code',
+        'date_of_birth', 'date_of_registration', 'party_affiliation', 'precinct_number',
+        *ELECTION_FIELDS, 'voter_score',
+    ]
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            raise Http404('Unknown export format.')
+        # values_list + iterator keeps memory flat: rows are fetched from the
+        # database cursor chunk_size at a time and never become model instances
+        rows = self.get_queryset().order_by(*self.ordering).values_list(*self.fields).iterator(chunk_size=self.chunk_size)
+        if export_format == 'csv':
+            response = StreamingHttpResponse(self.csv_lines(rows), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(self.ndjson_lines(rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="voters.{export_format}"'
+        return response
+
+    def csv_lines(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.fields)
+        for batch in chunked(rows, 500):
+            yield ''.join(writer.writerow(row) for row in batch)
+
+    def ndjson_lines(self, rows):
+        for batch in chunked(rows, 500):
+            yield ''.join(json.dumps(dict(zip(self.fields, row)), default=str) + '\n' for row in batch)
+
+
 class VoterDetailView(DetailView):
     model = Voter
     template_name = 'voter_analytics/voter_detail.html'
     context_object_name = 'voter'
-class GraphsView(ListView):
-    model = Voter
+class GraphsView(VoterFilterMixin, TemplateView):
     template_name = 'voter_analytics/graphs.html'
-    context_object_name = 'voters'
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        # Apply filters if they exist in GET parameters
-        party_affiliation = self.request.GET.get('party_affiliation')
-        min_dob = self.request.GET.get('min_dob')
-        max_dob = self.request.GET.get('max_dob')
-        voter_score = self.request.GET.get('voter_score')
-        elections = self.request.GET.getlist('elections')
-
-        if party_affiliation:
-            queryset = queryset.filter(party_affiliation=party_affiliation)
-        if min_dob:
-            queryset = queryset.filter(date_of_birth__year__gte=int(min_dob))
-        if max_dob:
-            queryset = queryset.filter(date_of_birth__year__lte=int(max_dob))
-        if voter_score:
-            queryset = queryset.filter(voter_score=int(voter_score))
-        if elections:
-            for election in elections:
-                filter_kwargs = {election: True}
-                queryset = queryset.filter(**filter_kwargs)
-
-        return queryset
+        # Charts are answered from the import-time rollup, never from Voter
+        return VoterRollup.objects.filter(self.voter_filter.rollup_q())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['party_affiliations'] = Voter.objects.values_list('party_affiliation', flat=True).distinct()
-        context['years'] = sorted(set(Voter.objects.values_list('date_of_birth__year', flat=True)))
-        context['voter_scores'] = sorted(set(Voter.objects.values_list('voter_score', flat=True)))
-        context['elections'] = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
-        # Histogram of Voters by Year of Birth
-        voters_by_year = self.get_queryset().annotate(year=ExtractYear('date_of_birth')).values('year').annotate(count=Count('id')).order_by('year')
-        years = [voter['year'] for voter in voters_by_year]
-        counts = [voter['count'] for voter in voters_by_year]
-
-        histogram = go.Figure([go.Bar(x=years, y=counts, marker=dict(color='blue'))])
-        histogram.update_layout(title='Distribution of Voters by Year of Birth', xaxis_title='Year of Birth', yaxis_title='Count')
-
-        # Pie Chart of Voters by Party Affiliation
-        voters_by_party = self.get_queryset().values('party_affiliation').annotate(count=Count('id'))
-        parties = [voter['party_affiliation'] for voter in voters_by_party]
-        party_counts = [voter['count'] for voter in voters_by_party]
-
-        pie_chart = go.Figure([go.Pie(labels=parties, values=party_counts)])
-        pie_chart.update_layout(title='Distribution of Voters by Party Affiliation')
-
-        # Histogram of Participation in Elections
-        election_fields = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
-        election_counts = {field: self.get_queryset().filter(**{field: True}).count() for field in election_fields}
-
-        election_histogram = go.Figure([go.Bar(x=list(election_counts.keys()), y=list(election_counts.values()), marker=dict(color='green'))])
-        election_histogram.update_layout(title='Voter Participation by Election', xaxis_title='Election', yaxis_title='Count')
-
-        # Add graphs to context
-        context['histogram'] = pio.to_html(histogram, full_html=False)
-        context['pie_chart'] = pio.to_html(pie_chart, full_html=False)
-        context['election_histogram'] = pio.to_html(election_histogram, full_html=False)
+        # The charts themselves are drawn in the browser from GraphDataView
+        context.update(voter_facets())
+        return context
+
+
+class GraphDataView(GraphsView):
+    # Compact chart arrays as JSON for the graphs page
+
+    def get(self, request, *args, **kwargs):
+        # Serialized payloads are reused for any request with the same
+        # filters until the next import changes the data
+        key = chart_cache_key(self.voter_filter, DataVersion.current())
+        payload = chart_cache.get(key)
+        if payload is None:
+            if columnar_engine_enabled():
+                # Vectorized filter + bincount over the in-memory columns
+                data = columnar_voters().chart_data(self.voter_filter)
+            else:
+                # One aggregation pass over the filtered rollup feeds all three charts
+                data = rollup_chart_data(self.get_queryset())
+            payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+            chart_cache.set(key, payload)
+        return HttpResponse(payload, content_type='application/json')
+
+
+class GeographyView(VoterFilterMixin, TemplateView):
+    # Per-precinct or per-zip breakdown of the filtered voters
+    template_name = 'voter_analytics/geography.html'
+
+    @cached_property
+    def area(self):
+        area = self.request.GET.get('by', 'precinct')
+        if area not in AREA_FIELDS:
+            raise Http404('Unknown geographic grouping.')
+        return area
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(voter_facets())
+        context['areas'] = list(AREA_FIELDS)
+        context['report'] = area_report(self.area, self.voter_filter)
         return context
 
+
+class GeographyDataView(GeographyView):
+    # The same report as JSON
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(area_report(self.area, self.voter_filter))